@@ -0,0 +1,45 @@
+"""
+Alembic environment for the TV Panel SQL backend.
+Uses the engine and metadata from database.py; a connection passed in
+config.attributes (see database.upgrade_database) takes precedence.
+"""
+
+from logging.config import fileConfig
+from alembic import context
+
+from database import engine, Base
+
+config = context.config
+connection = config.attributes.get("connection")
+
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as conn:
+        context.configure(connection=conn, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,66 @@
+"""Client lookup keys: normalized MAC and login columns
+
+Revision ID: 0001_client_lookup_keys
+Revises:
+Create Date: 2026-10-16
+
+The base schema is created by database.create_tables(), so every step
+checks what already exists and the migration is safe on fresh databases.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from database import normalize_mac, normalize_login
+
+revision = '0001_client_lookup_keys'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 1000
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'clients' not in inspector.get_table_names():
+        return
+
+    columns = {column['name'] for column in inspector.get_columns('clients')}
+    indexes = {index['name'] for index in inspector.get_indexes('clients')}
+
+    if 'mac_key' not in columns:
+        op.add_column('clients', sa.Column('mac_key', sa.String(50)))
+    if 'login_key' not in columns:
+        op.add_column('clients', sa.Column('login_key', sa.String(255)))
+    if 'ix_clients_mac_key' not in indexes:
+        op.create_index('ix_clients_mac_key', 'clients', ['mac_key'])
+    if 'ix_clients_login_key' not in indexes:
+        op.create_index('ix_clients_login_key', 'clients', ['login_key'])
+
+    # Backfill keys for rows written before the columns existed
+    conn = op.get_bind()
+    clients = sa.table('clients', sa.column('id'), sa.column('mac'), sa.column('login'),
+                       sa.column('mac_key'), sa.column('login_key'))
+    pending = sa.select(clients.c.id, clients.c.mac, clients.c.login).where(
+        sa.or_(
+            sa.and_(clients.c.mac.isnot(None), clients.c.mac_key.is_(None)),
+            sa.and_(clients.c.login.isnot(None), clients.c.login_key.is_(None))
+        )
+    )
+    rows = conn.execute(pending).fetchall()
+    update = clients.update().where(clients.c.id == sa.bindparam('row_id')).values(
+        mac_key=sa.bindparam('new_mac_key'), login_key=sa.bindparam('new_login_key')
+    )
+    for start in range(0, len(rows), BACKFILL_BATCH):
+        batch = rows[start:start + BACKFILL_BATCH]
+        conn.execute(update, [
+            {'row_id': row.id, 'new_mac_key': normalize_mac(row.mac), 'new_login_key': normalize_login(row.login)}
+            for row in batch
+        ])
+
+def downgrade():
+    op.drop_index('ix_clients_login_key', table_name='clients')
+    op.drop_index('ix_clients_mac_key', table_name='clients')
+    with op.batch_alter_table('clients') as batch_op:
+        batch_op.drop_column('login_key')
+        batch_op.drop_column('mac_key')
@@ -0,0 +1,40 @@
+"""Indexes for the hot Client predicates
+
+Revision ID: 0002_client_hot_indexes
+Revises: 0001_client_lookup_keys
+Create Date: 2026-10-16
+
+Covers the dashboard/bot expiry counts (expires_date, status), the
+per-panel and per-app client views and the admin activity listing.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_client_hot_indexes'
+down_revision = '0001_client_lookup_keys'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_clients_expires_date', ['expires_date']),
+    ('ix_clients_created_at', ['created_at']),
+    ('ix_clients_status_expires_date', ['status', 'expires_date']),
+    ('ix_clients_panel_id_expires_date', ['panel_id', 'expires_date']),
+    ('ix_clients_app_id_expires_date', ['app_id', 'expires_date']),
+    ('ix_clients_created_by_created_at', ['created_by', 'created_at']),
+]
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'clients' not in inspector.get_table_names():
+        return
+
+    existing = {index['name'] for index in inspector.get_indexes('clients')}
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'clients', columns)
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='clients')
@@ -0,0 +1,36 @@
+"""Per-table version counters for the reference data cache
+
+Revision ID: 0003_table_versions
+Revises: 0002_client_hot_indexes
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from database import VERSIONED_TABLES
+
+revision = '0003_table_versions'
+down_revision = '0002_client_hot_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'table_versions' not in inspector.get_table_names():
+        op.create_table(
+            'table_versions',
+            sa.Column('table_name', sa.String(50), primary_key=True),
+            sa.Column('version', sa.BigInteger, nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime),
+        )
+
+    conn = op.get_bind()
+    versions = sa.table('table_versions', sa.column('table_name'), sa.column('version'))
+    existing = {row.table_name for row in conn.execute(sa.select(versions.c.table_name))}
+    missing = sorted(VERSIONED_TABLES - existing)
+    if missing:
+        conn.execute(versions.insert(), [{'table_name': name, 'version': 0} for name in missing])
+
+def downgrade():
+    op.drop_table('table_versions')
@@ -0,0 +1,47 @@
+"""Client change feed: change sequence, updated_at index and tombstones
+
+Revision ID: 0004_client_change_feed
+Revises: 0003_table_versions
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_client_change_feed'
+down_revision = '0003_table_versions'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'clients' not in inspector.get_table_names():
+        return
+
+    columns = {column['name'] for column in inspector.get_columns('clients')}
+    indexes = {index['name'] for index in inspector.get_indexes('clients')}
+
+    # Existing rows start at sequence 0, so a mirror's first sync (no cursor) picks them up
+    if 'change_seq' not in columns:
+        op.add_column('clients', sa.Column('change_seq', sa.BigInteger, nullable=False, server_default='0'))
+    if 'ix_clients_change_seq_id' not in indexes:
+        op.create_index('ix_clients_change_seq_id', 'clients', ['change_seq', 'id'])
+    if 'ix_clients_updated_at' not in indexes:
+        op.create_index('ix_clients_updated_at', 'clients', ['updated_at'])
+
+    if 'client_tombstones' not in inspector.get_table_names():
+        op.create_table(
+            'client_tombstones',
+            sa.Column('client_id', sa.Integer, primary_key=True),
+            sa.Column('change_seq', sa.BigInteger, nullable=False),
+            sa.Column('deleted_at', sa.DateTime),
+        )
+        op.create_index('ix_client_tombstones_change_seq_client_id', 'client_tombstones', ['change_seq', 'client_id'])
+        op.create_index('ix_client_tombstones_deleted_at', 'client_tombstones', ['deleted_at'])
+
+def downgrade():
+    op.drop_table('client_tombstones')
+    op.drop_index('ix_clients_updated_at', table_name='clients')
+    op.drop_index('ix_clients_change_seq_id', table_name='clients')
+    with op.batch_alter_table('clients') as batch_op:
+        batch_op.drop_column('change_seq')
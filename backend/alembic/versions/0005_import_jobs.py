@@ -0,0 +1,47 @@
+"""Background import jobs
+
+Revision ID: 0005_import_jobs
+Revises: 0004_client_change_feed
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_import_jobs'
+down_revision = '0004_client_change_feed'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'import_jobs' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'import_jobs',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('table_name', sa.String(50), nullable=False),
+        sa.Column('file_format', sa.String(10), nullable=False),
+        sa.Column('file_path', sa.String(500), nullable=False),
+        sa.Column('original_filename', sa.String(255)),
+        sa.Column('status', sa.Enum('pending', 'running', 'completed', 'failed', 'cancelled')),
+        sa.Column('batch_size', sa.Integer, nullable=False),
+        sa.Column('rows_parsed', sa.Integer),
+        sa.Column('rows_inserted', sa.Integer),
+        sa.Column('rows_failed', sa.Integer),
+        sa.Column('resume_after_row', sa.Integer),
+        sa.Column('errors', sa.Text),
+        sa.Column('message', sa.Text),
+        sa.Column('cancel_requested', sa.Boolean),
+        sa.Column('heartbeat_at', sa.DateTime),
+        sa.Column('created_by', sa.Integer, sa.ForeignKey('admin.id')),
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime),
+        sa.Column('finished_at', sa.DateTime),
+    )
+    op.create_index('ix_import_jobs_id', 'import_jobs', ['id'])
+    op.create_index('ix_import_jobs_status', 'import_jobs', ['status'])
+
+def downgrade():
+    op.drop_table('import_jobs')
@@ -0,0 +1,32 @@
+"""Upsert mode for import jobs
+
+Revision ID: 0006_import_upsert
+Revises: 0005_import_jobs
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_import_upsert'
+down_revision = '0005_import_jobs'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('import_mode', sa.String(10)),
+    ('match_on', sa.String(100)),
+    ('rows_updated', sa.Integer),
+]
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('import_jobs')}
+    for name, type_ in COLUMNS:
+        if name not in existing:
+            op.add_column('import_jobs', sa.Column(name, type_))
+
+def downgrade():
+    with op.batch_alter_table('import_jobs') as batch_op:
+        for name, _ in reversed(COLUMNS):
+            batch_op.drop_column(name)
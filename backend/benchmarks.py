@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+TV Panel Benchmarks
+In-process performance checks for the SQL API, run against a throwaway SQLite database.
+
+Usage:
+    python benchmarks.py login-storm [--logins 50]
+    python benchmarks.py serialization [--rows 500]
+    python benchmarks.py import [--import-rows 100000] [--batch-size 1000] [--database-url mysql+pymysql://...]
+    python benchmarks.py parse [--import-rows 100000] [--parse-workers N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+def setup_environment(database_path: str = None, database_url: str = None):
+    """Point the app at a scratch database (or database_url, e.g. a MySQL test schema)
+    before database.py is imported"""
+    if database_url is None:
+        database_path = database_path or os.path.join(tempfile.mkdtemp(prefix="tv_panel_bench_"), "bench.db")
+        database_url = f"sqlite:///{database_path}"
+    os.environ["ENVIRONMENT"] = "development"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    return database_path
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def report(label, timings_ms):
+    print(f"{label:<32} n={len(timings_ms):<5} p50={statistics.median(timings_ms):7.1f} ms  "
+          f"p95={percentile(timings_ms, 95):7.1f} ms  max={max(timings_ms):7.1f} ms")
+
+async def api_client():
+    """httpx client bound to the ASGI app with the database initialized and an admin token"""
+    import httpx
+    import sql_server
+    from database import init_database, engine
+    from search import setup_search
+
+    init_database()
+    setup_search(engine)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=sql_server.app), base_url="http://bench")
+    response = await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return client
+
+async def probe(client, path, stop, timings):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+
+async def login_storm(logins: int):
+    """Latency of a cheap authenticated endpoint while a burst of logins is hashing"""
+    client = await api_client()
+    probe_path = "/api/contact-types"
+
+    idle = []
+    stop = asyncio.Event()
+    task = asyncio.create_task(probe(client, probe_path, stop, idle))
+    await asyncio.sleep(1)
+    stop.set()
+    await task
+
+    during = []
+    login_timings = []
+
+    async def one_login():
+        started = time.perf_counter()
+        await client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+        login_timings.append((time.perf_counter() - started) * 1000)
+
+    stop = asyncio.Event()
+    task = asyncio.create_task(probe(client, probe_path, stop, during))
+    await asyncio.gather(*[one_login() for _ in range(logins)])
+    stop.set()
+    await task
+
+    report(f"{probe_path} idle", idle)
+    report(f"{probe_path} during logins", during)
+    report("/api/auth/login", login_timings)
+    await client.aclose()
+
+def serialization(rows: int, rounds: int = 20):
+    """Client page serialization: response_model validation + JSONResponse vs direct dicts + orjson"""
+    import json
+    from datetime import date, datetime, timedelta
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import ORJSONResponse
+    from pydantic import TypeAdapter
+    from database import Client
+    from sql_server import ClientResponse, enrich_client_response
+
+    names = {"panel": {1: "Panel"}, "app": {1: "App"}, "contact_type": {1: "Telegram"}}
+    clients = [
+        Client(id=i, name=f"Client {i}", login=f"login{i}", password="secret", mac="00:1A:79:00:00:01",
+               expires_date=date.today() + timedelta(days=i % 60), panel_id=1, app_id=1, contact_type_id=1,
+               contact_value=f"@user{i}", notes="note", status="active", created_at=datetime.now())
+        for i in range(rows)
+    ]
+    adapter = TypeAdapter(List[ClientResponse])
+
+    def model_path():
+        # What the endpoint did before: build models, validate them against response_model, encode
+        models = [ClientResponse(**enrich_client_response(client, names)) for client in clients]
+        content = adapter.dump_python(adapter.validate_python(models), mode="json")
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False).encode("utf-8")
+
+    def direct_path():
+        return ORJSONResponse([enrich_client_response(client, names) for client in clients]).body
+
+    for label, path in (("response_model + json", model_path), ("row dicts + orjson", direct_path)):
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            path()
+            timings.append((time.perf_counter() - started) * 1000)
+        report(f"{label} ({rows} rows)", timings)
+
+def report_throughput(label, rows, seconds):
+    print(f"{label:<32} n={rows:<7} {seconds:7.2f} s  {rows / seconds:9.0f} rows/s")
+
+async def import_rows(rows: int, batch_size: int):
+    """Client import write path: ORM unit of work (commit every 100, the old import) vs batched Core
+    INSERTs, then the whole CSV upload endpoint and an upsert re-sync of the same file.
+    Clears the clients table between runs."""
+    import csv
+    import io
+    from sqlalchemy import delete
+    from database import AsyncSessionLocal, Client, normalize_mac, normalize_login
+    from imports import insert_batches, iter_items
+
+    client = await api_client()
+
+    def client_values(i):
+        login, mac = f"login{i}", f"00:1A:79:{i >> 16 & 255:02X}:{i >> 8 & 255:02X}:{i & 255:02X}"
+        return {"name": f"Client {i}", "login": login, "login_key": normalize_login(login), "password": "secret",
+                "mac": mac, "mac_key": normalize_mac(mac), "status": "active", "notes": "Imported from CSV"}
+
+    async def clear():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Client))
+            await db.commit()
+
+    await clear()
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for i in range(rows):
+            db.add(Client(**client_values(i)))
+            if (i + 1) % 100 == 0:
+                await db.commit()
+        await db.commit()
+    report_throughput("ORM add + commit/100", rows, time.perf_counter() - started)
+
+    await clear()
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await insert_batches(db, Client.__table__, iter_items([client_values(i) for i in range(rows)]), batch_size)
+        await db.commit()
+    report_throughput(f"Core executemany/{batch_size}", rows, time.perf_counter() - started)
+
+    await clear()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["Nazwa", "Login", "Hasło", "Data wygaśnięcia", "MAC", "Status", "ID"])
+    for i in range(rows):
+        values = client_values(i)
+        writer.writerow([values["name"], values["login"], "secret", "2027-01-01", values["mac"], "active", i])
+    started = time.perf_counter()
+    response = await client.post(
+        "/api/import-csv/clients", params={"batch_size": batch_size},
+        files={"file": ("bench.csv", output.getvalue().encode("utf-8"), "text/csv")}, timeout=None
+    )
+    report_throughput("POST /api/import-csv/clients", response.json()["imported_count"], time.perf_counter() - started)
+    
+    # Re-sync of the same file: every row matches an existing client
+    started = time.perf_counter()
+    response = await client.post(
+        "/api/import-csv/clients", params={"batch_size": batch_size, "mode": "upsert"},
+        files={"file": ("bench.csv", output.getvalue().encode("utf-8"), "text/csv")}, timeout=None
+    )
+    report_throughput("POST ... ?mode=upsert (re-sync)", response.json()["updated_count"], time.perf_counter() - started)
+    await client.aclose()
+
+async def parse_rows(rows: int, workers: int):
+    """CSV client row parsing alone (no writes): on the event loop vs a pool of parse workers"""
+    import csv
+    from fastapi import UploadFile
+    from database import AsyncSessionLocal
+    from imports import ImportProgress, client_csv_rows
+
+    client = await api_client()
+    await client.aclose()
+    path = os.path.join(tempfile.mkdtemp(prefix="tv_panel_bench_"), "parse.csv")
+    with open(path, "w", newline="", encoding="utf-8") as output:
+        writer = csv.writer(output)
+        writer.writerow(["Nazwa", "Login", "Hasło", "Data wygaśnięcia", "MAC", "Typ Kontaktu", "Dane Kontaktowe",
+                         "Line ID", "Status", "ID"])
+        for i in range(rows):
+            writer.writerow([f"Client {i}", f"login{i}", "secret", "2027-01-01", f"00:1A:79:00:{i >> 8 & 255:02X}:{i & 255:02X}",
+                             "Telegram", f"@user{i}", f"L{i}", "active", i])
+    
+    for label, parse_workers in (("parse on the event loop", 0), (f"parse with {workers} workers", workers)):
+        progress = ImportProgress()
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            upload = UploadFile(file=open(path, "rb"), filename="parse.csv")
+            async for _ in client_csv_rows(db, upload, progress, workers=parse_workers):
+                pass
+            await upload.close()
+        report_throughput(label, progress.parsed, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="TV Panel API benchmarks")
+    parser.add_argument('benchmark', choices=['login-storm', 'serialization', 'import', 'parse'])
+    parser.add_argument('--logins', type=int, default=50, help='Concurrent logins (login-storm)')
+    parser.add_argument('--rows', type=int, default=500, help='Rows per page (serialization)')
+    parser.add_argument('--import-rows', type=int, default=100000, help='Rows to import (import, parse)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT batch (import)')
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count(), help='Parse processes (parse)')
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary file)')
+    parser.add_argument('--database-url', help='Database URL to use instead of SQLite (its tables are written to)')
+    args = parser.parse_args()
+
+    setup_environment(args.database, args.database_url)
+    if args.benchmark == 'login-storm':
+        asyncio.run(login_storm(args.logins))
+    elif args.benchmark == 'serialization':
+        serialization(args.rows)
+    elif args.benchmark == 'import':
+        asyncio.run(import_rows(args.import_rows, args.batch_size))
+    elif args.benchmark == 'parse':
+        asyncio.run(parse_rows(args.import_rows, args.parse_workers))
+
+if __name__ == "__main__":
+    main()
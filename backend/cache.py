@@ -0,0 +1,119 @@
+"""
+TV Panel In-Process Caches
+Small TTL cache for auth principals and a versioned cache for the reference tables.
+Caches are per worker process: explicit invalidation is local, the TTL bounds staleness elsewhere.
+"""
+
+import os
+import time
+from decimal import Decimal
+from threading import Lock
+import orjson
+from sqlalchemy import select
+
+from database import TableVersion, table_change_listeners
+
+_MISSING = object()
+
+class TTLCache:
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return default
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first, then the oldest insertions
+                now = time.monotonic()
+                for stale in [k for k, (_, expires_at) in self._entries.items() if expires_at < now]:
+                    del self._entries[stale]
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+def json_default(value):
+    """orjson `default` for the types SQLAlchemy returns that orjson can't serialize (MySQL DECIMAL)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+class ReferenceCache:
+    """Rows of the small reference tables, validated against their table_versions counter.
+
+    Commits in this process invalidate immediately (database.table_change_listeners);
+    changes from other processes (json_importer.py, other workers) are noticed within
+    check_interval seconds.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._versions = {}  # table -> (version, next check at)
+        self._rows = {}  # table -> (version, rows as dicts)
+        self._json = {}  # (table, fields) -> (version, serialized body)
+
+    async def version(self, db, table_name: str) -> int:
+        checked = self._versions.get(table_name)
+        if checked and checked[1] > time.monotonic():
+            return checked[0]
+        version = await db.scalar(
+            select(TableVersion.version).where(TableVersion.table_name == table_name)
+        ) or 0
+        self._versions[table_name] = (version, time.monotonic() + self.check_interval)
+        return version
+
+    async def rows(self, db, model) -> list:
+        """All rows of a reference table as column dicts (shared; do not mutate)"""
+        table_name = model.__tablename__
+        version = await self.version(db, table_name)
+        cached = self._rows.get(table_name)
+        if cached and cached[0] == version:
+            return cached[1]
+        columns = [column.name for column in model.__table__.columns]
+        result = await db.execute(select(*[model.__table__.c[name] for name in columns]))
+        rows = [dict(zip(columns, row)) for row in result]
+        self._rows[table_name] = (version, rows)
+        return rows
+
+    async def json(self, db, model, fields: list) -> bytes:
+        """JSON array of the rows projected onto `fields`, serialized once per table version"""
+        table_name = model.__tablename__
+        key = (table_name, tuple(fields))
+        version = await self.version(db, table_name)
+        cached = self._json.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        rows = await self.rows(db, model)
+        body = orjson.dumps([{field: row.get(field) for field in fields} for row in rows], default=json_default)
+        self._json[key] = (version, body)
+        return body
+
+    async def names(self, db, model) -> dict:
+        """id -> name map for a reference table"""
+        return {row["id"]: row["name"] for row in await self.rows(db, model)}
+
+    def invalidate(self, tables):
+        for table_name in tables:
+            self._versions.pop(table_name, None)
+            self._rows.pop(table_name, None)
+        self._json = {key: value for key, value in self._json.items() if key[0] not in tables}
+
+reference_cache = ReferenceCache(check_interval=float(os.getenv("REFERENCE_CACHE_CHECK_SECONDS", "5")))
+table_change_listeners.append(reference_cache.invalidate)
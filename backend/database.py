@@ -3,12 +3,15 @@ TV Panel SQL Database Configuration
 SQLAlchemy models for MySQL database with all tables from the provided schema.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Date, Boolean, ForeignKey, BigInteger, Enum, DECIMAL
+from sqlalchemy import create_engine, event, select, update, insert, Index, Column, Integer, String, Text, DateTime, Date, Boolean, ForeignKey, BigInteger, Enum, DECIMAL
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, validates, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.sql import func
 from datetime import datetime, date
 import os
+import re
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -22,11 +25,51 @@ else:
     # Development SQLite configuration
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./tv_panel.db")
 
-# SQLAlchemy setup
+# Async driver for the API: aiosqlite in development, aiomysql in production
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqlconnector": "mysql+aiomysql",
+}
+_scheme, _rest = DATABASE_URL.split("://", 1)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", f"{ASYNC_DRIVERS.get(_scheme, _scheme)}://{_rest}")
+
+# SQLAlchemy setup (sync engine for scripts and migrations, async engine for the API)
 engine = create_engine(DATABASE_URL, echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False, pool_pre_ping=True)
+if async_engine.dialect.name == "sqlite":
+    # The sqlite3 driver only opens a transaction at the first INSERT/UPDATE/DELETE, so a SAVEPOINT taken
+    # before one runs outside any transaction and its RELEASE commits. Let SQLAlchemy emit BEGIN itself
+    # (SQLAlchemy's documented pysqlite/aiosqlite recipe), so savepoints nest in the session's transaction.
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _sqlite_driver_transactions_off(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(async_engine.sync_engine, "begin")
+    def _sqlite_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+# expire_on_commit=False: attribute access after commit must not trigger lazy IO in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+# ============ LOOKUP KEYS ============
+
+def normalize_mac(mac):
+    """Canonical MAC key: hex digits only, upper case (00-1a-79… -> 001A79…)"""
+    if not mac:
+        return None
+    return re.sub(r'[^0-9A-Fa-f]', '', mac).upper() or None
+
+def normalize_login(login):
+    """Canonical login key: trimmed, lower case"""
+    if not login:
+        return None
+    return login.strip().lower() or None
+
 # ============ MODELS ============
 
 class Admin(Base):
@@ -89,16 +132,27 @@ class ContactType(Base):
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # Hot predicates: dashboard/bot expiry counts, per-panel/app views, admin activity
+        Index("ix_clients_status_expires_date", "status", "expires_date"),
+        Index("ix_clients_panel_id_expires_date", "panel_id", "expires_date"),
+        Index("ix_clients_app_id_expires_date", "app_id", "expires_date"),
+        Index("ix_clients_created_by_created_at", "created_by", "created_at"),
+        # Change feed keyset
+        Index("ix_clients_change_seq_id", "change_seq", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     line_id = Column(String(50))
     name = Column(String(255), nullable=False)
-    expires_date = Column(Date)
+    expires_date = Column(Date, index=True)
     panel_id = Column(Integer, ForeignKey("panels.id"))
     login = Column(String(255), index=True)
     password = Column(String(255))
     app_id = Column(Integer, ForeignKey("apps.id"))
     mac = Column(String(50), index=True)
+    mac_key = Column(String(50), index=True)  # normalize_mac(mac)
+    login_key = Column(String(255), index=True)  # normalize_login(login)
     key_value = Column(String(255))
     contact_type_id = Column(Integer, ForeignKey("contact_types.id"))
     contact_value = Column(String(255))
@@ -106,10 +160,11 @@ class Client(Base):
     telegram_username_display = Column(String(255))
     notes = Column(Text)
     status = Column(Enum('active', 'inactive', 'suspended'), default='active')
-    created_at = Column(DateTime, default=func.current_timestamp())
-    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+    created_at = Column(DateTime, default=func.current_timestamp(), index=True)
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp(), index=True)
     created_by = Column(Integer, ForeignKey("admin.id"))
     telegram_username = Column(String(255))
+    change_seq = Column(BigInteger, nullable=False, default=0)  # set from next_change_seq() on every write
     
     # Relationships
     panel = relationship("Panel", back_populates="clients")
@@ -117,6 +172,16 @@ class Client(Base):
     contact_type = relationship("ContactType", back_populates="clients")
     creator = relationship("Admin")
     links = relationship("ClientLink", back_populates="client", cascade="all, delete-orphan")
+    
+    @validates('mac')
+    def _set_mac_key(self, key, value):
+        self.mac_key = normalize_mac(value)
+        return value
+    
+    @validates('login')
+    def _set_login_key(self, key, value):
+        self.login_key = normalize_login(value)
+        return value
 
 class ClientLink(Base):
     __tablename__ = "client_links"
@@ -365,6 +430,127 @@ class ActivationRequest(Base):
     # Relationships
     processor = relationship("Admin")
 
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(50), nullable=False)
+    file_format = Column(String(10), nullable=False)  # csv, json
+    file_path = Column(String(500), nullable=False)  # upload saved under IMPORT_JOBS_DIR
+    original_filename = Column(String(255))
+    status = Column(Enum('pending', 'running', 'completed', 'failed', 'cancelled'), default='pending', index=True)
+    batch_size = Column(Integer, nullable=False)
+    import_mode = Column(String(10), default='insert')  # insert, upsert
+    match_on = Column(String(100))  # upsert natural keys, e.g. "login,mac,line_id"
+    rows_parsed = Column(Integer, default=0)
+    rows_inserted = Column(Integer, default=0)
+    rows_updated = Column(Integer, default=0)
+    rows_failed = Column(Integer, default=0)
+    resume_after_row = Column(Integer, default=0)  # last source row covered by a committed batch
+    errors = Column(Text)  # JSON list of the first row errors
+    message = Column(Text)
+    cancel_requested = Column(Boolean, default=False)
+    heartbeat_at = Column(DateTime)  # refreshed with every committed batch while running
+    created_by = Column(Integer, ForeignKey("admin.id"))
+    created_at = Column(DateTime, default=func.current_timestamp())
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+    finished_at = Column(DateTime)
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    
+    table_name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+class ClientTombstone(Base):
+    __tablename__ = "client_tombstones"
+    __table_args__ = (
+        Index("ix_client_tombstones_change_seq_client_id", "change_seq", "client_id"),
+    )
+    
+    client_id = Column(Integer, primary_key=True)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, default=func.current_timestamp(), index=True)
+
+# ============ TABLE VERSIONS ============
+
+# Small read-mostly tables served from the in-process reference cache
+VERSIONED_TABLES = {
+    "panels", "apps", "contact_types", "payment_methods", "pricing_config",
+    "questions", "smart_tv_apps", "smart_tv_activations", "android_apps",
+}
+
+# Called with the set of changed table names after each commit that touched them
+table_change_listeners = []
+
+def bump_table_versions(connection, tables):
+    """Increment the stored version of each table (any process can detect the change)"""
+    for table_name in tables:
+        result = connection.execute(
+            update(TableVersion.__table__)
+            .where(TableVersion.table_name == table_name)
+            .values(version=TableVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(TableVersion.__table__).values(table_name=table_name, version=1))
+
+def next_change_seq(session) -> int:
+    """Allocate the next client change sequence number (the "clients" table version) in the
+    session's transaction. The counter row stays locked until commit, so sequence order matches
+    commit order; table_change_listeners are told about "clients" after the commit."""
+    connection = session.connection()
+    bump_table_versions(connection, ["clients"])
+    session.info.setdefault("changed_tables", set()).add("clients")
+    return connection.execute(
+        select(TableVersion.version).where(TableVersion.table_name == "clients")
+    ).scalar_one()
+
+def record_bulk_write(session, table_name: str):
+    """Bookkeeping the flush hooks do for ORM writes, for Core INSERT/UPDATE/DELETE statements:
+    returns a change sequence number for clients, bumps the version of reference tables"""
+    if table_name == "clients":
+        return next_change_seq(session)
+    if table_name in VERSIONED_TABLES:
+        bump_table_versions(session.connection(), [table_name])
+        session.info.setdefault("changed_tables", set()).add(table_name)
+    return None
+
+@event.listens_for(Session, "before_flush")
+def _stamp_client_changes(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, Client)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Client) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Client)]
+    if not changed and not deleted:
+        return
+    seq = next_change_seq(session)
+    for client in changed:
+        client.change_seq = seq
+    for client in deleted:
+        session.merge(ClientTombstone(client_id=client.id, change_seq=seq, deleted_at=datetime.utcnow()))
+
+@event.listens_for(Session, "after_flush")
+def _track_versioned_tables(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in [*session.new, *session.dirty, *session.deleted]
+        if obj.__table__.name in VERSIONED_TABLES
+    }
+    if tables:
+        bump_table_versions(session.connection(), tables)
+        session.info.setdefault("changed_tables", set()).update(tables)
+
+@event.listens_for(Session, "after_commit")
+def _notify_table_changes(session):
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        for listener in table_change_listeners:
+            listener(tables)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_table_changes(session):
+    session.info.pop("changed_tables", None)
+
 # ============ DATABASE FUNCTIONS ============
 
 def get_db():
@@ -375,10 +561,50 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@contextmanager
+def count_queries(*binds):
+    """Count SQL statements executed on the engines, e.g. `with count_queries() as queries: ...; assert len(queries) <= 2`"""
+    binds = [getattr(bind, "sync_engine", bind) for bind in binds] or [engine, async_engine.sync_engine]
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for bind in binds:
+        event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for bind in binds:
+            event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+def explain(statement):
+    """Query plan of a select() (EXPLAIN QUERY PLAN on SQLite, EXPLAIN elsewhere), to check index use"""
+    statement = getattr(statement, "statement", statement)  # legacy ORM Query
+    compiled = statement.compile(bind=engine, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN" if engine.dialect.name == "sqlite" else "EXPLAIN"
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.exec_driver_sql(f"{prefix} {compiled}")]
+
 def create_tables():
     """Create all tables"""
     Base.metadata.create_all(bind=engine)
 
+def upgrade_database():
+    """Apply pending Alembic migrations (backend/alembic) to the configured database"""
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
 def drop_tables():
     """Drop all tables"""
     Base.metadata.drop_all(bind=engine)
@@ -386,6 +612,7 @@ def drop_tables():
 def init_database():
     """Initialize database with sample data"""
     create_tables()
+    upgrade_database()
     
     db = SessionLocal()
     
@@ -395,13 +622,14 @@ def init_database():
         
         if not admin_exists:
             # Create default admin
-            import bcrypt
-            
-            hashed_password = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            try:
+                from passwords import hash_password
+            except ImportError:  # imported as backend.database from the root scripts
+                from backend.passwords import hash_password
             
             admin = Admin(
                 login="admin",
-                password=hashed_password,
+                password=hash_password("admin123"),
                 email="admin@tvpanel.com"
             )
             
@@ -0,0 +1,186 @@
+"""
+TV Panel Exports
+Table exports streamed from a server-side cursor as CSV or NDJSON, optionally gzip-compressed on the fly,
+and snapshot files of them that downloads can resume with HTTP Range requests.
+"""
+
+import asyncio
+import csv
+import hashlib
+import io
+import logging
+import os
+import re
+import time
+import uuid
+import zlib
+import orjson
+from sqlalchemy import select
+
+from cache import json_default
+from database import AsyncSessionLocal, TableVersion
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Export format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+# Snapshot files are kept here; unused snapshots are removed after EXPORT_SNAPSHOT_TTL_SECONDS
+EXPORT_SNAPSHOTS_DIR = os.getenv(
+    "EXPORT_SNAPSHOTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "export_snapshots")
+)
+EXPORT_SNAPSHOT_TTL_SECONDS = int(os.getenv("EXPORT_SNAPSHOT_TTL_SECONDS", str(24 * 3600)))
+# Bytes read from a snapshot file per chunk of a download
+EXPORT_READ_CHUNK_BYTES = 256 * 1024
+
+SNAPSHOT_NAME = re.compile(r'^[a-z_]+-[0-9a-f]{16}\.(csv|ndjson)(\.gz)?$')
+
+async def stream_export_rows(query):
+    """Yield result partitions of EXPORT_BATCH_SIZE rows from a server-side cursor.
+    Uses its own session: the request's session is closed before the response body is sent."""
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield rows
+
+async def stream_csv(query):
+    """CSV export body: the header, then one chunk per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in query.selected_columns])
+    yield buffer.getvalue().encode('utf-8')
+    async for rows in stream_export_rows(query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+async def stream_ndjson(query):
+    """NDJSON export body: one object per row, one chunk per fetched batch"""
+    columns = [column.name for column in query.selected_columns]
+    async for rows in stream_export_rows(query):
+        yield b"".join(
+            orjson.dumps(dict(zip(columns, row)), default=json_default, option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+async def gzip_chunks(chunks, level: int = None):
+    """Compress a byte stream into a gzip file as it is produced"""
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+async def export_stream(query, export_format: str = "csv", compress: bool = False):
+    """Export body in `export_format`, gzipped when `compress`"""
+    chunks = stream_ndjson(query) if export_format == "ndjson" else stream_csv(query)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception:
+        # Headers are already sent, so the client only sees a truncated file
+        logger.exception("Export failed")
+        raise
+
+def export_filename(table_name: str, export_format: str = "csv", compress: bool = False) -> str:
+    return f"{table_name}_export.{EXPORT_FORMATS[export_format][1]}" + (".gz" if compress else "")
+
+def export_media_type(export_format: str, compress: bool) -> str:
+    return "application/gzip" if compress else EXPORT_FORMATS[export_format][0]
+
+# ============ SNAPSHOTS ============
+
+def snapshot_path(name: str):
+    """Path of a snapshot file, or None for a name that is not one (never leaves EXPORT_SNAPSHOTS_DIR)"""
+    if not SNAPSHOT_NAME.match(name):
+        return None
+    path = os.path.join(EXPORT_SNAPSHOTS_DIR, name)
+    return path if os.path.isfile(path) else None
+
+def snapshot_etag(path: str) -> str:
+    stat = os.stat(path)
+    return f'"{os.path.basename(path)}-{stat.st_size}-{int(stat.st_mtime)}"'
+
+def touch_snapshot(path: str):
+    """Mark a snapshot as used (access time) so it is not pruned; the modification time in its ETag stays"""
+    os.utime(path, (time.time(), os.stat(path).st_mtime))
+
+def prune_snapshots():
+    """Remove snapshots not created or downloaded within EXPORT_SNAPSHOT_TTL_SECONDS"""
+    if not os.path.isdir(EXPORT_SNAPSHOTS_DIR):
+        return
+    expired_before = time.time() - EXPORT_SNAPSHOT_TTL_SECONDS
+    for entry in os.scandir(EXPORT_SNAPSHOTS_DIR):
+        try:
+            if entry.is_file() and max(entry.stat().st_mtime, entry.stat().st_atime) < expired_before:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+async def table_versions(db, tables) -> dict:
+    rows = await db.execute(select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables)))
+    return {**{table: 0 for table in tables}, **dict(rows.all())}
+
+async def create_snapshot(db, query, table_name: str, source_tables, export_format: str = "csv", compress: bool = False) -> str:
+    """Write the export to a snapshot file and return its name. The name is derived from the versions
+    of `source_tables`, so an unchanged table reuses its existing snapshot."""
+    versions = await table_versions(db, source_tables)
+    digest = hashlib.sha1(repr((sorted(versions.items()), export_format, compress)).encode()).hexdigest()[:16]
+    name = f"{table_name}-{digest}.{EXPORT_FORMATS[export_format][1]}" + (".gz" if compress else "")
+    path = os.path.join(EXPORT_SNAPSHOTS_DIR, name)
+    if os.path.isfile(path):
+        touch_snapshot(path)
+        return name
+
+    await asyncio.to_thread(prune_snapshots)
+    os.makedirs(EXPORT_SNAPSHOTS_DIR, exist_ok=True)
+    # Written under a temporary name: a download never sees a partial snapshot
+    partial = os.path.join(EXPORT_SNAPSHOTS_DIR, f".{uuid.uuid4().hex}.partial")
+    try:
+        with open(partial, "wb") as output:
+            async for chunk in export_stream(query, export_format, compress):
+                await asyncio.to_thread(output.write, chunk)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return name
+
+def parse_range(header: str, size: int):
+    """(first, last) byte offsets of a single "bytes=" range, None to send the whole file.
+    Raises ValueError when the range starts past the end (416)."""
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', (header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None  # absent, malformed or multiple ranges: the whole file
+    first, last = match.groups()
+    if first == "":
+        if int(last) == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - int(last), 0), size - 1  # suffix: the last N bytes
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError("Range not satisfiable")
+    return first, min(int(last), size - 1) if last else size - 1
+
+async def file_chunks(path: str, first: int, last: int):
+    """Bytes first..last (inclusive) of a file, read off the event loop"""
+    with open(path, "rb") as source:
+        source.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(source.read, min(EXPORT_READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,163 @@
+"""
+TV Panel Import Dry Run
+Vectorized (pandas) validation of a client CSV before it is imported: a per-row report of what the import
+would reject, update or duplicate, computed chunk by chunk without writing to the database.
+"""
+
+import asyncio
+import os
+import pandas as pd
+from sqlalchemy import select
+
+from database import Panel
+from imports import CLIENT_MATCH_KEYS, CLIENT_STATUSES, IMPORT_REPORT_MAX_ISSUES, ClientKeyIndex
+
+# Rows per pandas chunk
+IMPORT_DRY_RUN_CHUNK_ROWS = int(os.getenv("IMPORT_DRY_RUN_CHUNK_ROWS", "50000"))
+
+# Natural key -> CSV column it comes from
+CSV_KEY_COLUMNS = {"login": "Login", "mac": "MAC", "line_id": "Line ID"}
+MAC_KEY_PATTERN = r'[0-9A-F]{12}'
+
+def _text(value):
+    return value if isinstance(value, str) else None  # NaN where an issue has no column / value
+
+class ImportReport:
+    """Issues found so far: errors are rows the import rejects, warnings rows it imports as they are
+    (bad MACs, duplicates in the file, and in insert mode duplicates of existing clients)"""
+
+    def __init__(self, match_keys: list, existing: dict, upsert: bool):
+        self.match_keys = match_keys
+        # clients column -> Series of client ids by key, for the target panel (indexed once, mapped per chunk)
+        self.existing = {column: pd.Series(ids, dtype=object) for column, ids in existing.items()}
+        self.upsert = upsert
+        self.first_rows = {key: {} for key in match_keys}  # key -> {value: first row with it}
+        self.issues = []
+        self.total_rows = 0
+        self.rejected_rows = 0
+        self.update_rows = 0
+
+    def add(self, severity: str, issue: str, rows: pd.Series, column: str, values: pd.Series, messages):
+        if len(rows):
+            self.issues.append(pd.DataFrame({
+                "row": rows, "severity": severity, "type": issue, "column": column, "value": values, "message": messages
+            }))
+
+    def check_chunk(self, chunk: pd.DataFrame):
+        rows = pd.Series(chunk.index + 2, index=chunk.index)  # the header is row 1
+        self.total_rows += len(chunk)
+
+        missing = chunk.isna().any(axis=1)  # short rows are rejected by the import
+        chunk = chunk.fillna("")
+
+        def column(name):
+            return chunk[name].str.strip() if name in chunk else pd.Series("", index=chunk.index)
+
+        self.add("error", "missing_fields", rows[missing], None, None, "row has fewer fields than the header")
+
+        dates = column('Data wygaśnięcia')
+        bad = (dates != "") & pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce').isna()
+        self.add("error", "invalid_date", rows[bad], 'Data wygaśnięcia', dates[bad], "invalid date (expected YYYY-MM-DD)")
+        rejected = missing | bad
+
+        statuses = column('Status')
+        bad = (statuses != "") & ~statuses.isin(CLIENT_STATUSES)
+        self.add("error", "invalid_status", rows[bad], 'Status', statuses[bad],
+                 f"invalid status (expected {', '.join(CLIENT_STATUSES)})")
+        rejected |= bad
+
+        macs = column('MAC')
+        mac_keys = macs.str.replace(r'[^0-9A-Fa-f]', '', regex=True).str.upper()
+        bad = (macs != "") & (~macs.str.fullmatch(r'[0-9A-Fa-f:\-.\s]+') | ~mac_keys.str.fullmatch(MAC_KEY_PATTERN))
+        self.add("warning", "invalid_mac", rows[bad], 'MAC', macs[bad], "MAC is not 12 hex digits")
+
+        keys = {
+            "login": column('Login').str.lower(),
+            "mac": mac_keys,
+            "line_id": column('Line ID'),
+        }
+        accepted = ~rejected
+        matched = pd.Series(float("nan"), index=chunk.index)
+        duplicate = pd.Series(False, index=chunk.index)
+        for key in self.match_keys:
+            values = keys[key][accepted & (keys[key] != "")]
+            name = CSV_KEY_COLUMNS[key]
+
+            # Duplicates within the file, across chunks: every value maps to the first row that had it
+            first = pd.Series(rows[values.index].values, index=values.values)
+            first = first[~first.index.duplicated()]
+            seen = self.first_rows[key]
+            for value, row in zip(first.index.tolist(), first.tolist()):
+                seen.setdefault(value, row)
+            first_rows = values.map(seen.get)
+            repeated = first_rows != rows[values.index]
+            self.add("warning", "duplicate_in_file", rows[values.index][repeated], name, values[repeated],
+                     [f"same {key} as row {row}" for row in first_rows[repeated]])
+            duplicate[repeated[repeated].index] = True
+
+            # Clients of the panel that already have the value: an upsert updates them (the first key
+            # that hits wins), a plain import adds a duplicate
+            client_ids = values.map(self.existing[CLIENT_MATCH_KEYS[key]])
+            found = client_ids.notna()
+            if not self.upsert:
+                self.add("warning", "exists_in_db", rows[values.index][found], name, values[found],
+                         [f"same {key} as client {int(client_id)}" for client_id in client_ids[found]])
+            matched = matched.fillna(client_ids.reindex(chunk.index))
+
+        self.rejected_rows += int(rejected.sum())
+        if self.upsert:
+            # A repeated key updates the client the earlier row wrote
+            self.update_rows += int((accepted & (matched.notna() | duplicate)).sum())
+
+    def result(self) -> dict:
+        columns = ["row", "severity", "type", "column", "value", "message"]
+        issues = pd.concat(self.issues, ignore_index=True) if self.issues else pd.DataFrame(columns=columns)
+        issues = issues.sort_values("row", kind="stable")
+        accepted = self.total_rows - self.rejected_rows
+        return {
+            "dry_run": True,
+            "mode": "upsert" if self.upsert else "insert",
+            "total_rows": self.total_rows,
+            "valid_rows": accepted,
+            "rejected_rows": self.rejected_rows,
+            "would_insert": accepted - self.update_rows,
+            "would_update": self.update_rows,
+            "error_count": int((issues["severity"] == "error").sum()),
+            "warning_count": int((issues["severity"] == "warning").sum()),
+            "issue_counts": {
+                f"{severity}.{issue}": int(count) for (severity, issue), count in issues.groupby(["severity", "type"]).size().items()
+            },
+            "issues": [
+                {
+                    "row": int(issue.row), "severity": issue.severity, "type": issue.type,
+                    "column": _text(issue.column), "value": _text(issue.value), "message": issue.message
+                }
+                for issue in issues.head(IMPORT_REPORT_MAX_ISSUES).itertuples(index=False)
+            ],
+            "issues_truncated": len(issues) > IMPORT_REPORT_MAX_ISSUES,
+        }
+
+def build_report(source, report: ImportReport) -> dict:
+    """Run the checks over a CSV file object chunk by chunk (blocking; call off the event loop)"""
+    header = pd.read_csv(source, nrows=0, encoding="utf-8-sig").columns
+    source.seek(0)
+    chunks = pd.read_csv(
+        source, dtype=str, keep_default_na=False, encoding="utf-8-sig", chunksize=IMPORT_DRY_RUN_CHUNK_ROWS,
+        # Rows with extra fields are imported with the extras ignored; keep their row numbers aligned
+        engine="python", on_bad_lines=lambda fields: fields[:len(header)]
+    )
+    with chunks:
+        for chunk in chunks:
+            report.check_chunk(chunk)
+    return report.result()
+
+async def dry_run_client_csv(db, upload, match_keys: list, upsert: bool = False) -> dict:
+    """Validate a client CSV upload without importing it. Existing keys of the panel the import would
+    write to are loaded once (read-only); the checks run in a thread."""
+    # The panel prepare_client_import picks, without creating one
+    panel_id = await db.scalar(select(Panel.id).limit(1))
+    index = ClientKeyIndex(panel_id, match_keys)
+    if panel_id is not None:
+        await index.load(db)
+    report = ImportReport(match_keys, index.ids, upsert)
+    return await asyncio.to_thread(build_report, upload.file, report)
@@ -0,0 +1,810 @@
+"""
+TV Panel Imports
+Streaming readers for uploaded import files, an optional process pool parse stage, a batched Core INSERT
+engine (with an upsert mode for clients) and background import jobs; memory stays bounded by one read
+chunk plus one batch (per parse worker).
+"""
+
+import asyncio
+import codecs
+import collections
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from fastapi import UploadFile
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select, insert, update, bindparam, and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import (
+    AsyncSessionLocal, Client, Panel, ContactType, ImportJob, PaymentMethod, PricingConfig, Question,
+    SmartTVApp, AndroidApp, normalize_mac, normalize_login, record_bulk_write
+)
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload per await
+IMPORT_READ_CHUNK_BYTES = int(os.getenv("IMPORT_READ_CHUNK_BYTES", str(64 * 1024)))
+# Rows per executemany INSERT (and per savepoint)
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Processes parsing CSV client rows; 0 parses on the event loop
+IMPORT_PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", "0"))
+# Characters of whole CSV records per chunk handed to a parse worker
+IMPORT_PARSE_CHUNK_CHARS = int(os.getenv("IMPORT_PARSE_CHUNK_CHARS", str(1024 * 1024)))
+# Uploads of background jobs are kept here until the job finishes
+IMPORT_JOBS_DIR = os.getenv("IMPORT_JOBS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_jobs"))
+# A running job whose heartbeat is older than this is taken over (worker restarted or died)
+IMPORT_JOB_STALE_SECONDS = int(os.getenv("IMPORT_JOB_STALE_SECONDS", "60"))
+# A running job refreshes its heartbeat this often, however long its batches take
+IMPORT_JOB_HEARTBEAT_SECONDS = IMPORT_JOB_STALE_SECONDS / 3
+# Row errors kept on a job
+IMPORT_JOB_MAX_ERRORS = 100
+# Row errors listed in an import response or dry-run report (all of them are counted)
+IMPORT_REPORT_MAX_ISSUES = int(os.getenv("IMPORT_REPORT_MAX_ISSUES", "1000"))
+# Messages an import keeps: as many as any of the above lists, so memory stays bounded however many rows fail
+IMPORT_MAX_ERRORS = max(IMPORT_JOB_MAX_ERRORS, IMPORT_REPORT_MAX_ISSUES)
+
+# Import modes: plain INSERT, or update clients matched on a natural key and insert the rest
+IMPORT_MODES = ("insert", "upsert")
+# Natural keys an upsert can match clients on -> clients column holding the normalized value
+CLIENT_MATCH_KEYS = {"login": "login_key", "mac": "mac_key", "line_id": "line_id"}
+DEFAULT_CLIENT_MATCH_KEYS = ["login", "mac", "line_id"]
+CLIENT_STATUSES = Client.status.type.enums
+
+# Catalog tables accepted by the JSON import
+JSON_IMPORT_TABLES = {
+    "payment_methods": PaymentMethod,
+    "pricing_config": PricingConfig,
+    "questions": Question,
+    "smart_tv_apps": SmartTVApp,
+    "android_apps": AndroidApp,
+}
+# Table name -> pydantic *Create model its JSON items are validated against; registered by
+# sql_server, where the API models are defined
+JSON_IMPORT_SCHEMAS = {}
+
+class ImportProgress:
+    """Row counters shared by a row source and insert_batches"""
+
+    def __init__(self, parsed: int = 0, inserted: int = 0, failed: int = 0, errors: list = None, updated: int = 0):
+        self.parsed = parsed
+        self.inserted = inserted
+        self.updated = updated
+        self.failed = failed
+        self.errors = errors if errors is not None else []
+
+    def error(self, row_num: int, message):
+        """Count a rejected row; only the first IMPORT_MAX_ERRORS messages are kept"""
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(f"Wiersz {row_num}: {message}")
+
+class ImportCancelled(Exception):
+    pass
+
+async def iter_upload_lines(upload, chunk_size: int = None):
+    """Decoded lines (with their "\\n") of an UploadFile, read chunk by chunk.
+    utf-8-sig drops the BOM spreadsheet exports put in front of the header."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = await upload.read(chunk_size or IMPORT_READ_CHUNK_BYTES)
+        pending += decoder.decode(chunk, final=not chunk)
+        # Split on "\n" only: csv handles "\r\n", and other Unicode separators are field data
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+async def iter_csv_records(upload, chunk_size: int = None):
+    """Complete CSV records as text; a quoted field may span several lines.
+    A record ends at a line end once its quote count is even (quotes inside fields are doubled)."""
+    record = []
+    quotes = 0
+    async for line in iter_upload_lines(upload, chunk_size):
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield "".join(record)
+            record = []
+            quotes = 0
+    if record:
+        yield "".join(record)
+
+async def iter_csv_rows(upload, chunk_size: int = None):
+    """(row number, dict) pairs like csv.DictReader, parsed while the upload is read.
+    Row numbers count the header as row 1, as the import error messages always have."""
+    fieldnames = None
+    row_num = 1
+    async for record in iter_csv_records(upload, chunk_size):
+        if fieldnames is None:
+            fieldnames = next(csv.reader([record]), None) or None  # skip blank lines before the header
+            continue
+        for row in csv.DictReader([record], fieldnames=fieldnames):
+            row_num += 1
+            yield row_num, row
+
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+async def iter_json_items(upload, chunk_size: int = None):
+    """(row number, item) pairs from a JSON array or NDJSON upload, parsed while it is read.
+    Array items are numbered from 1 and malformed JSON raises ValueError; NDJSON rows are
+    numbered by line and a malformed line is yielded as its JSONDecodeError."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    parser = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    expect = "start"  # start, first item, item, separator, end (array) or line (NDJSON)
+    row_num = 0
+    while True:
+        if expect not in ("start", "line"):
+            position = JSON_WHITESPACE.match(buffer, position).end()
+        need_more = position >= len(buffer)
+        if not need_more:
+            if expect == "start":
+                # Leading blank lines still count as NDJSON lines, so only peek past them
+                start = JSON_WHITESPACE.match(buffer).end()
+                if start == len(buffer):
+                    need_more = not eof
+                    expect = "start" if need_more else "end"
+                elif buffer[start] == "[":
+                    position, expect = start + 1, "first item"
+                else:
+                    expect = "line"
+            elif expect == "line":
+                end = buffer.find("\n", position)
+                if end == -1 and not eof:
+                    need_more = True
+                else:
+                    end = len(buffer) if end == -1 else end
+                    line, position = buffer[position:end], end + 1
+                    row_num += 1
+                    if line.strip():
+                        try:
+                            item = json.loads(line)
+                        except json.JSONDecodeError as e:
+                            item = e
+                        yield row_num, item
+            elif expect == "first item" and buffer[position] == "]":
+                position += 1
+                expect = "end"
+            elif expect in ("first item", "item"):
+                try:
+                    item, end = parser.raw_decode(buffer, position)
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise ValueError(f"Invalid JSON in item {row_num + 1}: {e}")
+                    need_more = True
+                else:
+                    # A value ending at the end of the buffer may be a cut number; read on to be sure
+                    if end == len(buffer) and not eof:
+                        need_more = True
+                    else:
+                        row_num += 1
+                        yield row_num, item
+                        position = end
+                        expect = "separator"
+            elif expect == "separator" and buffer[position] in ",]":
+                expect = "item" if buffer[position] == "," else "end"
+                position += 1
+            else:
+                raise ValueError(f"Invalid JSON after item {row_num}: expected ',' or ']'" if expect == "separator"
+                                 else "Unexpected data after the JSON array")
+        if need_more:
+            if eof:
+                break
+            chunk = await upload.read(chunk_size or IMPORT_READ_CHUNK_BYTES)
+            buffer = buffer[position:] + decoder.decode(chunk, final=not chunk)
+            position, eof = 0, not chunk
+    if expect not in ("start", "end", "line"):
+        raise ValueError("Unexpected end of the JSON array")
+
+# ============ BATCHED INSERTS ============
+
+async def iter_items(items):
+    """(row number, item) pairs from an in-memory list, for insert_batches / json_table_rows"""
+    for row_num, item in enumerate(items, start=1):
+        yield row_num, item
+
+async def _write_batch(db, statement_for, batch, progress: ImportProgress) -> int:
+    """Execute one batch inside a savepoint; on failure retry row by row so only bad rows are lost.
+    `statement_for(column names)` gives the INSERT/UPDATE for rows with that key set."""
+    # executemany needs one key set per statement; rows that omit columns keep their defaults
+    groups = {}
+    for row_num, values in batch:
+        groups.setdefault(frozenset(values), []).append(values)
+    try:
+        async with db.begin_nested():
+            for keys, rows in groups.items():
+                await db.execute(statement_for(keys), rows)
+        return len(batch)
+    except SQLAlchemyError:
+        pass
+    
+    written = 0
+    for row_num, values in batch:
+        try:
+            async with db.begin_nested():
+                await db.execute(statement_for(frozenset(values)), values)
+            written += 1
+        except SQLAlchemyError as e:
+            progress.error(row_num, getattr(e, 'orig', None) or e)
+    return written
+
+async def _insert_batch(db, table, batch, progress: ImportProgress) -> int:
+    return await _write_batch(db, lambda keys: insert(table), batch, progress)
+
+def _pending_change_seq() -> int:
+    """Placeholder change_seq for the rows an import writes until the real one is allocated (unique per
+    import, and negative so the change feed never returns it)"""
+    return -(uuid.uuid4().int >> 65) - 1
+
+async def _record_changes(db, table, pending: int):
+    """Change bookkeeping for the rows written since the last commit, done right before the commit:
+    allocate a clients change sequence number and stamp it on the rows carrying `pending`, or bump the
+    version of a reference table. The counter row stays locked only until the commit."""
+    change_seq = await db.run_sync(record_bulk_write, table.name)
+    if change_seq is not None:
+        await db.execute(update(table).where(table.c.change_seq == pending).values(change_seq=change_seq))
+
+async def _write_batches(db, table, rows, write_batch, batch_size: int, progress: ImportProgress, on_batch) -> int:
+    """Hand (row number, column values) pairs to `write_batch(batch)` (returns rows inserted) in batches.
+    Core statements skip the ORM flush hooks, so their change bookkeeping is done before every commit:
+    before each on_batch, or once at the end when the caller commits."""
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    pending = _pending_change_seq() if "change_seq" in table.c else None
+    written = progress.inserted + progress.updated  # rows written when the transaction began
+    
+    inserted = 0
+    batch = []
+    
+    async def flush():
+        nonlocal inserted, written
+        count = await write_batch(batch)
+        inserted += count
+        progress.inserted += count
+        if on_batch:
+            if progress.inserted + progress.updated > written:
+                await _record_changes(db, table, pending)
+                written = progress.inserted + progress.updated
+            await on_batch(batch[-1][0])
+    
+    async for row_num, values in rows:
+        if pending is not None:
+            values["change_seq"] = pending
+        batch.append((row_num, values))
+        if len(batch) >= batch_size:
+            await flush()
+            batch = []
+    if batch:
+        await flush()
+    if not on_batch and progress.inserted + progress.updated > written:
+        await _record_changes(db, table, pending)
+    return inserted
+
+async def insert_batches(db, table, rows, batch_size: int = None, progress: ImportProgress = None, on_batch=None) -> int:
+    """Insert (row number, column values) pairs from an async iterable with one executemany INSERT per
+    batch of IMPORT_BATCH_SIZE rows, each in its own savepoint. Returns the number of rows inserted;
+    rejected rows are counted in `progress`. `on_batch(last row number)` is awaited after every batch
+    (background jobs commit there); otherwise the caller commits right after this returns."""
+    progress = progress if progress is not None else ImportProgress()
+    return await _write_batches(
+        db, table, rows, lambda batch: _insert_batch(db, table, batch, progress), batch_size, progress, on_batch
+    )
+
+# ============ UPSERT ============
+
+def parse_match_keys(match_on: str) -> list:
+    """Natural keys from a comma-separated list ("login,mac,line_id"), in priority order"""
+    keys = [key.strip() for key in (match_on or "").split(",") if key.strip()]
+    unknown = [key for key in keys if key not in CLIENT_MATCH_KEYS]
+    if unknown or not keys:
+        raise ValueError(f"match_on must be a list of {', '.join(CLIENT_MATCH_KEYS)}")
+    return list(dict.fromkeys(keys))
+
+class ClientKeyIndex:
+    """Natural key -> client id hash maps for one panel, loaded with one SELECT and topped up
+    with the ids of rows the import inserts"""
+
+    def __init__(self, panel_id: int, match_keys: list):
+        self.panel_id = panel_id
+        self.columns = [CLIENT_MATCH_KEYS[key] for key in match_keys]
+        self.ids = {column: {} for column in self.columns}
+        self.max_id = 0
+    
+    def keys(self, values: dict) -> list:
+        """(column, value) pairs of a row, in priority order; empty values never match"""
+        return [(column, values.get(column)) for column in self.columns if values.get(column)]
+    
+    def find(self, values: dict):
+        for column, value in self.keys(values):
+            client_id = self.ids[column].get(value)
+            if client_id is not None:
+                return client_id
+        return None
+    
+    async def load(self, db):
+        """Add the panel's clients with ids above max_id (all of them on the first call)"""
+        result = await db.execute(
+            select(Client.id, *[getattr(Client, column) for column in self.columns])
+            .where(Client.panel_id == self.panel_id, Client.id > self.max_id)
+            .order_by(Client.id)
+        )
+        for client_id, *keys in result:
+            for column, value in zip(self.columns, keys):
+                if value:
+                    # The oldest client keeps a key shared by several
+                    self.ids[column].setdefault(value, client_id)
+            self.max_id = client_id
+
+def _client_update(keys):
+    """UPDATE clients by id for rows with these bind names: "_" + column (a bind name may not be a column name)"""
+    return (
+        update(Client.__table__)
+        .where(Client.__table__.c.id == bindparam("_id"))
+        .values({key[1:]: bindparam(key) for key in keys if key != "_id"})
+    )
+
+async def _upsert_client_batch(db, batch, indexes: dict, match_keys: list, progress: ImportProgress):
+    """Split a batch into UPDATEs of matched clients and INSERTs of new ones; rows of the batch that
+    share a key with an earlier new row are folded into it (the later row wins)"""
+    inserts = []  # [row_num, values], in file order
+    pending = {}  # (panel, column, value) -> position in inserts
+    updates = {}  # client id -> (row_num, bind values)
+    now = datetime.utcnow()
+    for row_num, values in batch:
+        panel_id = values.get("panel_id")
+        index = indexes.get(panel_id)
+        if index is None:
+            index = indexes[panel_id] = ClientKeyIndex(panel_id, match_keys)
+            await index.load(db)
+        client_id = index.find(values)
+        if client_id is not None:
+            bind = {f"_{key}": value for key, value in values.items()}
+            bind.update(_id=client_id, _updated_at=now)
+            updates[client_id] = (row_num, bind)
+            continue
+        keys = [(panel_id, column, value) for column, value in index.keys(values)]
+        position = next((pending[key] for key in keys if key in pending), None)
+        if position is None:
+            position = len(inserts)
+            inserts.append([row_num, values])
+        else:
+            inserts[position] = [row_num, values]
+        for key in keys:
+            pending.setdefault(key, position)
+    
+    # Rows superseded by a later row of the batch count as updates of the client it writes
+    progress.updated += len(batch) - len(inserts) - len(updates)
+    progress.updated += await _write_batch(db, _client_update, list(updates.values()), progress)
+    inserted = await _write_batch(db, lambda keys: insert(Client.__table__), [tuple(row) for row in inserts], progress)
+    if inserts:
+        # Later batches match the new rows too
+        for index in indexes.values():
+            await index.load(db)
+    return inserted
+
+async def upsert_client_batches(db, rows, match_keys: list = None, batch_size: int = None,
+                                progress: ImportProgress = None, on_batch=None) -> int:
+    """insert_batches for clients, updating clients that match a row on one of `match_keys`
+    (login, normalized MAC, line_id; first match wins) instead of inserting a duplicate.
+    Existing keys of each panel are preloaded into a hash index, so a batch is one executemany
+    UPDATE plus one executemany INSERT. Returns the number of rows inserted; updates are counted in
+    `progress.updated`."""
+    progress = progress if progress is not None else ImportProgress()
+    match_keys = match_keys or DEFAULT_CLIENT_MATCH_KEYS
+    indexes = {}
+    return await _write_batches(
+        db, Client.__table__, rows, lambda batch: _upsert_client_batch(db, batch, indexes, match_keys, progress),
+        batch_size, progress, on_batch
+    )
+
+# ============ ROW SOURCES ============
+
+async def prepare_client_import(db):
+    """Default panel and contact type ids for CSV client rows, created when missing"""
+    # Get or create default panel and contact types
+    default_panel = await db.scalar(select(Panel).limit(1))
+    if not default_panel:
+        default_panel = Panel(name="Import Panel", description="Auto-created during CSV import")
+        db.add(default_panel)
+        await db.commit()
+        await db.refresh(default_panel)
+    
+    # Create contact type mapping
+    contact_type_mapping = {}
+    for contact_type in ['WhatsApp', 'Telegram', 'Messanger']:
+        ct = await db.scalar(select(ContactType).where(ContactType.name == contact_type).limit(1))
+        if not ct:
+            ct = ContactType(name=contact_type, description=f"Auto-created for {contact_type}")
+            db.add(ct)
+            await db.commit()
+            await db.refresh(ct)
+        contact_type_mapping[contact_type] = ct.id
+    
+    return default_panel.id, contact_type_mapping
+
+def client_values_from_csv(row, panel_id: int, contact_type_mapping: dict) -> dict:
+    """clients column values for a row of the reseller CSV export (Polish headers)"""
+    if None in row.values():
+        raise ValueError("row has fewer fields than the header")
+    # Parse telegram ID from contact data if it's a telegram username
+    telegram_id = None
+    contact_value = row.get('Dane Kontaktowe', '').strip()
+    contact_type = row.get('Typ Kontaktu', '').strip()
+    
+    # Extract telegram ID from username (if it starts with @)
+    if contact_type == 'Telegram' and contact_value.startswith('@'):
+        # For now, we'll store the username in contact_value
+        # In a real implementation, you'd need to resolve @username to telegram_id
+        pass
+    
+    # Parse expiration date
+    expires_date = None
+    date_str = row.get('Data wygaśnięcia', '').strip()
+    if date_str:
+        try:
+            expires_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"invalid date '{date_str}' (expected YYYY-MM-DD)")
+    
+    status = row.get('Status', '').strip() or 'active'
+    if status not in CLIENT_STATUSES:
+        raise ValueError(f"invalid status '{status}' (expected {', '.join(CLIENT_STATUSES)})")
+    
+    # Get contact type ID
+    contact_type_id = contact_type_mapping.get(contact_type) if contact_type else None
+    
+    login = row.get('Login', '').strip()
+    mac = row.get('MAC', '').strip()
+    return {
+        "name": row.get('Nazwa', '').strip(),
+        "login": login,
+        "login_key": normalize_login(login),
+        "password": row.get('Hasło', '').strip(),
+        "expires_date": expires_date,
+        "panel_id": panel_id,
+        "mac": mac,
+        "mac_key": normalize_mac(mac),
+        "key_value": row.get('Klucz', '').strip(),
+        "contact_type_id": contact_type_id,
+        "contact_value": contact_value,
+        "telegram_id": telegram_id,
+        "line_id": row.get('Line ID', '').strip(),
+        "status": status,
+        "notes": f"Imported from CSV. Original ID: {row.get('ID', '')}"
+    }
+
+def parse_client_chunk(fieldnames: list, text: str, panel_id: int, contact_type_mapping: dict) -> list:
+    """clients values (or an error message) for each row of a chunk of whole CSV records; runs in a
+    parse worker, so it only takes and returns picklable values"""
+    results = []
+    for row in csv.DictReader(io.StringIO(text, newline=""), fieldnames=fieldnames):
+        try:
+            results.append((True, client_values_from_csv(row, panel_id, contact_type_mapping)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results
+
+def _record_end(text: str, last: bool = False) -> int:
+    """Offset just past the first (or last) line end that closes a whole record; 0 if there is none.
+    As in iter_csv_records, a line end closes a record when the quotes before it are even."""
+    position = text.rfind("\n") if last else text.find("\n")
+    while position != -1 and text.count('"', 0, position) % 2:
+        position = text.rfind("\n", 0, position) if last else text.find("\n", position + 1)
+    return position + 1
+
+async def iter_csv_chunks(upload, chunk_chars: int = None):
+    """(header field names, text of whole records) from an upload, about `chunk_chars` characters each.
+    Chunks are cut at record ends with str.count / str.rfind, so the event loop never touches single rows."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    fieldnames = None
+    pending = ""
+    while True:
+        chunk = await upload.read(IMPORT_READ_CHUNK_BYTES)
+        pending += decoder.decode(chunk, final=not chunk)
+        if chunk and len(pending) < (chunk_chars or IMPORT_PARSE_CHUNK_CHARS):
+            continue
+        end = _record_end(pending, last=True) if chunk else len(pending)
+        text, pending = pending[:end], pending[end:]
+        while fieldnames is None and text:
+            end = _record_end(text) or len(text)
+            fieldnames = next(csv.reader([text[:end]]), None) or None  # skip blank lines before the header
+            text = text[end:]
+        if text:
+            yield fieldnames, text
+        if not chunk:
+            break
+
+_parse_pools = {}  # worker count -> ProcessPoolExecutor
+
+def parse_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool of `workers` CSV parsers, started on first use and kept for the life of the process.
+    Workers come from a forkserver (spawn where there is none): forking the server process itself is
+    unsafe once it runs threads (aiosqlite, the password hashing pool)."""
+    pool = _parse_pools.get(workers)
+    if pool is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        pool = _parse_pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+    return pool
+
+def shutdown_parse_pools():
+    for pool in _parse_pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _parse_pools.clear()
+
+async def parse_client_chunks(upload, panel_id: int, contact_type_mapping: dict, workers: int):
+    """(row number, parse result) for a CSV upload, parsed by a pool of `workers` processes.
+    At most two chunks per worker are in flight and results come back in file order, so the single
+    writer consumes them as if they had been parsed inline."""
+    loop = asyncio.get_running_loop()
+    pool = parse_pool(workers)
+    in_flight = collections.deque()
+    row_num = 1
+    try:
+        async for fieldnames, text in iter_csv_chunks(upload):
+            in_flight.append(loop.run_in_executor(
+                pool, parse_client_chunk, fieldnames, text, panel_id, contact_type_mapping
+            ))
+            while len(in_flight) >= workers * 2 or (in_flight and in_flight[0].done()):
+                for result in await in_flight.popleft():
+                    row_num += 1
+                    yield row_num, result
+        while in_flight:
+            for result in await in_flight.popleft():
+                row_num += 1
+                yield row_num, result
+    finally:
+        # The import stopped early: drop its queued chunks (the pool is shared and stays up)
+        for future in in_flight:
+            future.cancel()
+
+async def client_csv_rows(db, upload, progress: ImportProgress, resume_after: int = 0, workers: int = None):
+    """(row number, clients values) from a CSV upload; rows up to `resume_after` are skipped.
+    With `workers` (default IMPORT_PARSE_WORKERS) above 1 rows are parsed in a process pool."""
+    panel_id, contact_type_mapping = await prepare_client_import(db)
+    workers = IMPORT_PARSE_WORKERS if workers is None else workers
+    if workers > 1:
+        results = parse_client_chunks(upload, panel_id, contact_type_mapping, workers)
+        async for row_num, (ok, result) in results:
+            if row_num <= resume_after:
+                continue
+            progress.parsed += 1
+            if not ok:
+                progress.error(row_num, result)
+                continue
+            yield row_num, result
+        return
+    
+    # Rows are parsed while the upload is read, so memory stays bounded for large files
+    async for row_num, row in iter_csv_rows(upload):
+        if row_num <= resume_after:
+            continue
+        progress.parsed += 1
+        try:
+            values = client_values_from_csv(row, panel_id, contact_type_mapping)
+        except Exception as e:
+            progress.error(row_num, str(e))
+            continue
+        yield row_num, values
+
+def _validate_json_items(model, schema, batch, progress: ImportProgress) -> list:
+    """(row number, column values) for the valid items of a batch. The batch is validated against the
+    *Create model in one call; only a batch with errors is split up to find the valid items."""
+    columns = set(model.__table__.columns.keys())
+    items = []
+    errors = {}
+    for row_num, item in batch:
+        if isinstance(item, json.JSONDecodeError):
+            errors[row_num] = f"invalid JSON: {item}"
+        elif not isinstance(item, dict):
+            errors[row_num] = "not an object"
+        elif set(item) - columns:
+            errors[row_num] = f"unknown fields {sorted(set(item) - columns)}"
+        else:
+            items.append((row_num, item))
+    if schema is not None and items:
+        adapter = TypeAdapter(list[schema])
+        try:
+            validated = adapter.validate_python([item for _, item in items])
+        except ValidationError as e:
+            invalid = {}
+            for error in e.errors():
+                index, *location = error["loc"]
+                field = ".".join(map(str, location))
+                invalid.setdefault(index, []).append(f"{field}: {error['msg']}" if field else error["msg"])
+            for index, messages in invalid.items():
+                errors[items[index][0]] = "; ".join(messages)
+            items = [entry for index, entry in enumerate(items) if index not in invalid]
+            validated = adapter.validate_python([item for _, item in items])
+        schema_fields = set(schema.model_fields)
+        rows = []
+        for (row_num, item), values in zip(items, adapter.dump_python(validated)):
+            for key in schema_fields - columns:
+                del values[key]
+            # Columns the model doesn't cover (id, timestamps) are passed through as before
+            values.update((key, value) for key, value in item.items() if key not in schema_fields)
+            rows.append((row_num, values))
+    else:
+        rows = [(row_num, dict(item)) for row_num, item in items]
+    for row_num in sorted(errors):
+        progress.error(row_num, errors[row_num])
+    return rows
+
+async def json_table_rows(model, items, progress: ImportProgress, resume_after: int = 0, schema=None):
+    """(row number, column values) from (row number, item) pairs of a JSON upload, validated against
+    `schema` (default: the table's registered *Create model) a batch at a time; rows up to
+    `resume_after` are skipped"""
+    schema = schema or JSON_IMPORT_SCHEMAS.get(model.__tablename__)
+    batch = []
+    async for row_num, item in items:
+        if row_num <= resume_after:
+            continue
+        progress.parsed += 1
+        batch.append((row_num, item))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            for row in _validate_json_items(model, schema, batch, progress):
+                yield row
+            batch = []
+    for row in _validate_json_items(model, schema, batch, progress):
+        yield row
+
+# ============ BACKGROUND JOBS ============
+
+_running_jobs = {}  # job id -> task, for jobs running in this process
+_cancelled_jobs = set()  # running here and asked to stop
+
+async def save_upload(upload) -> str:
+    """Copy an upload to IMPORT_JOBS_DIR chunk by chunk; returns the file path"""
+    os.makedirs(IMPORT_JOBS_DIR, exist_ok=True)
+    extension = os.path.splitext(upload.filename or "")[1]
+    path = os.path.join(IMPORT_JOBS_DIR, f"{uuid.uuid4().hex}{extension}")
+    with open(path, "wb") as output:
+        while chunk := await upload.read(IMPORT_READ_CHUNK_BYTES):
+            await asyncio.to_thread(output.write, chunk)
+    return path
+
+def cancel_running_import_job(job_id: int) -> bool:
+    """Ask a job running in this process to stop before its next commit (no database write,
+    which on SQLite would wait behind the job's own write lock)"""
+    if job_id in _running_jobs:
+        _cancelled_jobs.add(job_id)
+        return True
+    return False
+
+def start_import_job(job_id: int):
+    """Run a job in the background in this process (no-op if it is already running here)"""
+    if job_id not in _running_jobs:
+        task = asyncio.create_task(run_import_job(job_id))
+        _running_jobs[job_id] = task
+        task.add_done_callback(lambda _: (_running_jobs.pop(job_id, None), _cancelled_jobs.discard(job_id)))
+
+async def _claim_import_job(db, job_id: int) -> bool:
+    """Atomically mark a pending or abandoned running job as running in this process"""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job_id,
+            or_(
+                ImportJob.status == "pending",
+                and_(
+                    ImportJob.status == "running",
+                    or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < now - timedelta(seconds=IMPORT_JOB_STALE_SECONDS))
+                )
+            )
+        )
+        .values(status="running", heartbeat_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+async def _keep_import_job_alive(job_id: int):
+    """Refresh a running job's heartbeat every IMPORT_JOB_HEARTBEAT_SECONDS from its own session, so a
+    batch that runs longer than IMPORT_JOB_STALE_SECONDS is not taken over by another worker"""
+    while True:
+        await asyncio.sleep(IMPORT_JOB_HEARTBEAT_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(ImportJob).where(ImportJob.id == job_id, ImportJob.status == "running")
+                    .values(heartbeat_at=datetime.utcnow()).execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except SQLAlchemyError as e:
+            logger.warning(f"Import job {job_id} heartbeat failed: {e}")
+
+async def run_import_job(job_id: int):
+    """Import a saved upload, committing after every batch together with the job's progress,
+    so a restarted job continues after the last committed batch"""
+    async with AsyncSessionLocal() as db:
+        if not await _claim_import_job(db, job_id):
+            return
+        job = await db.get(ImportJob, job_id)
+        progress = ImportProgress(
+            job.rows_parsed or 0, job.rows_inserted or 0, job.rows_failed or 0, json.loads(job.errors or "[]"),
+            job.rows_updated or 0
+        )
+        # Read up front: a rollback expires the job object
+        table_name, file_path, batch_size = job.table_name, job.file_path, job.batch_size
+        import_mode, match_on = job.import_mode or "insert", job.match_on
+        resume_after = job.resume_after_row or 0
+        
+        async def on_batch(last_row_num: int):
+            if job_id in _cancelled_jobs or await db.scalar(select(ImportJob.cancel_requested).where(ImportJob.id == job_id)):
+                raise ImportCancelled()
+            job.rows_parsed = progress.parsed
+            job.rows_inserted = progress.inserted
+            job.rows_updated = progress.updated
+            job.rows_failed = progress.failed
+            job.errors = json.dumps(progress.errors[:IMPORT_JOB_MAX_ERRORS], ensure_ascii=False)
+            job.resume_after_row = last_row_num
+            job.heartbeat_at = datetime.utcnow()
+            await db.commit()
+        
+        upload = UploadFile(file=open(file_path, "rb"), filename=job.original_filename)
+        # Not on SQLite: a second writer there deadlocks with the batch's transaction, and a takeover
+        # (a write too) cannot happen while a batch holds the database write lock anyway
+        heartbeat = asyncio.create_task(_keep_import_job_alive(job_id)) if db.bind.dialect.name != "sqlite" else None
+        try:
+            if table_name == "clients":
+                rows = client_csv_rows(db, upload, progress, resume_after)
+                if import_mode == "upsert":
+                    await upsert_client_batches(db, rows, parse_match_keys(match_on), batch_size, progress, on_batch)
+                else:
+                    await insert_batches(db, Client.__table__, rows, batch_size, progress, on_batch)
+            else:
+                model = JSON_IMPORT_TABLES[table_name]
+                rows = json_table_rows(model, iter_json_items(upload), progress, resume_after)
+                await insert_batches(db, model.__table__, rows, batch_size, progress, on_batch)
+            status, message = "completed", None
+        except ImportCancelled:
+            await db.rollback()
+            status, message = "cancelled", "Import cancelled; batches committed before the cancel were kept"
+        except Exception as e:
+            logger.exception(f"Import job {job_id} failed")
+            await db.rollback()
+            status, message = "failed", str(e)
+        finally:
+            if heartbeat:
+                heartbeat.cancel()
+            await upload.close()
+        
+        values = {"status": status, "message": message, "finished_at": datetime.utcnow()}
+        if status == "cancelled":
+            values["cancel_requested"] = True
+        elif status == "completed":
+            values.update(
+                rows_parsed=progress.parsed, rows_inserted=progress.inserted, rows_updated=progress.updated,
+                rows_failed=progress.failed,
+                errors=json.dumps(progress.errors[:IMPORT_JOB_MAX_ERRORS], ensure_ascii=False)
+            )
+        await db.execute(update(ImportJob).where(ImportJob.id == job_id).values(**values).execution_options(synchronize_session=False))
+        await db.commit()
+        if status != "failed" and os.path.exists(file_path):
+            os.remove(file_path)
+
+async def resume_import_jobs():
+    """Start pending jobs and take over running jobs abandoned by a stopped worker; runs for the
+    lifetime of the app and checks every IMPORT_JOB_STALE_SECONDS"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                job_ids = (await db.execute(
+                    select(ImportJob.id).where(ImportJob.status.in_(["pending", "running"]))
+                )).scalars().all()
+            for job_id in job_ids:
+                start_import_job(job_id)
+        except Exception:
+            logger.exception("Import job check failed")
+        await asyncio.sleep(IMPORT_JOB_STALE_SECONDS)
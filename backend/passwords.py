@@ -0,0 +1,36 @@
+"""
+TV Panel Password Hashing
+bcrypt hashing on a bounded worker pool so logins never block the event loop.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+# bcrypt cost factor; raising it rehashes admin passwords on their next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a few threads hash in parallel while the loop keeps serving
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+
+def hash_password(password: str, rounds: int = None) -> str:
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+def verify_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def needs_rehash(hashed: str) -> bool:
+    """True when the hash was made with a different cost factor than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_executor, verify_password, password, hashed)
@@ -0,0 +1,154 @@
+"""
+TV Panel Client Search
+Indexed full-text search over clients: FTS5 on SQLite, FULLTEXT (ngram) on MySQL, LIKE as the fallback.
+"""
+
+import logging
+import re
+from sqlalchemy import text, Integer, Float, and_, or_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.exc import DBAPIError
+
+from database import Client, normalize_mac, normalize_login
+
+logger = logging.getLogger(__name__)
+
+# Columns covered by the search box
+SEARCH_COLUMNS = ["name", "login", "mac", "line_id", "contact_value"]
+
+# Active backend: "fts5", "fulltext" or None (LIKE fallback)
+search_backend = None
+# Shortest term the index can answer (trigram / ngram token size)
+min_term_length = 1
+
+SQLITE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_ai AFTER INSERT ON clients BEGIN
+        INSERT INTO clients_fts(rowid, name, login, mac, line_id, contact_value)
+        VALUES (new.id, new.name, new.login, new.mac, new.line_id, new.contact_value);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_ad AFTER DELETE ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name, login, mac, line_id, contact_value)
+        VALUES ('delete', old.id, old.name, old.login, old.mac, old.line_id, old.contact_value);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_au AFTER UPDATE OF name, login, mac, line_id, contact_value ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name, login, mac, line_id, contact_value)
+        VALUES ('delete', old.id, old.name, old.login, old.mac, old.line_id, old.contact_value);
+        INSERT INTO clients_fts(rowid, name, login, mac, line_id, contact_value)
+        VALUES (new.id, new.name, new.login, new.mac, new.line_id, new.contact_value);
+    END""",
+]
+
+def _setup_sqlite(conn):
+    global min_term_length
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients_fts'")).first()
+    if not exists:
+        columns = ", ".join(SEARCH_COLUMNS)
+        try:
+            # Trigram tokenizer gives substring matches (partial MACs, logins) from the index
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE clients_fts USING fts5({columns}, content='clients', content_rowid='id', tokenize='trigram')"
+            ))
+        except DBAPIError:
+            # SQLite < 3.34: word tokenizer with prefix queries
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE clients_fts USING fts5({columns}, content='clients', content_rowid='id')"
+            ))
+        for trigger in SQLITE_FTS_TRIGGERS:
+            conn.execute(text(trigger))
+        conn.execute(text("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')"))
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'clients_fts'")).scalar()
+    min_term_length = 3 if "trigram" in sql else 1
+
+def _setup_mysql(conn):
+    global min_term_length
+    exists = conn.execute(text(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = 'clients' AND index_name = 'ft_clients_search' LIMIT 1"
+    )).first()
+    if not exists:
+        columns = ", ".join(SEARCH_COLUMNS)
+        conn.execute(text(f"ALTER TABLE clients ADD FULLTEXT INDEX ft_clients_search ({columns}) WITH PARSER ngram"))
+    min_term_length = conn.execute(text("SELECT @@ngram_token_size")).scalar() or 2
+
+def setup_search(engine):
+    """Create the search index for the engine's dialect (idempotent); falls back to LIKE on failure"""
+    global search_backend
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                _setup_sqlite(conn)
+                search_backend = "fts5"
+            elif engine.dialect.name == "mysql":
+                _setup_mysql(conn)
+                search_backend = "fulltext"
+            else:
+                search_backend = None
+    except DBAPIError as e:
+        logger.warning(f"Full-text search unavailable, using LIKE fallback: {e}")
+        search_backend = None
+    return search_backend
+
+# Pasted MACs: 00:1A:79…, 00-1a-79…, 001A.79…, or 12 bare hex digits
+MAC_PATTERN = re.compile(r'^[0-9A-Fa-f]{2}([:\-.]?[0-9A-Fa-f]{2}){1,5}$')
+
+def looks_like_mac(search: str) -> bool:
+    search = search.strip()
+    return bool(MAC_PATTERN.match(search)) and (len(search) == 12 or not search.isalnum())
+
+def prefix_filter(column, prefix: str):
+    """Prefix match as a range so it is a single index seek on every dialect"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+def lookup_filter(mac: str = None, login: str = None, exact: bool = False):
+    """Exact or prefix match on the normalized MAC / login keys"""
+    conditions = []
+    for column, key in ((Client.mac_key, normalize_mac(mac)), (Client.login_key, normalize_login(login))):
+        if key:
+            conditions.append(column == key if exact else prefix_filter(column, key))
+    return and_(*conditions) if conditions else None
+
+def _terms(search: str):
+    return [term.replace('"', '') for term in search.split()]
+
+def like_filter(search: str):
+    """Unindexed substring match, used when no full-text index can answer the query"""
+    return (
+        (Client.name.contains(search)) |
+        (Client.login.contains(search)) |
+        (Client.mac.contains(search)) |
+        (Client.line_id.contains(search)) |
+        (Client.contact_value.contains(search))
+    )
+
+def apply_search(query, search: str):
+    """Filter a Client query by the search box text. MAC-shaped input also matches the normalized
+    MAC key, so a MAC in any format is found; the text match still applies (numeric logins, line ids).
+    Returns (query, relevance ordering or None when the fallback path was used)."""
+    mac_condition = lookup_filter(mac=search) if looks_like_mac(search) else None
+
+    terms = [term for term in _terms(search) if term]
+    if not terms or search_backend is None or any(len(term) < min_term_length for term in terms):
+        condition = like_filter(search)
+        return query.filter(condition if mac_condition is None else or_(condition, mac_condition)), None
+
+    if search_backend == "fts5":
+        if min_term_length >= 3:
+            fts_query = " ".join(f'"{term}"' for term in terms)
+        else:
+            fts_query = " ".join(f'"{term}"*' for term in terms)
+        fts = text(
+            "SELECT rowid AS id, bm25(clients_fts) AS rank FROM clients_fts WHERE clients_fts MATCH :fts_query"
+        ).bindparams(fts_query=fts_query).columns(id=Integer, rank=Float).subquery("fts")
+        if mac_condition is None:
+            return query.join(fts, fts.c.id == Client.id), fts.c.rank.asc()
+        # MAC-only hits have no rank and sort first (NULLs first ascending)
+        query = query.outerjoin(fts, fts.c.id == Client.id).filter(or_(fts.c.id.is_not(None), mac_condition))
+        return query, fts.c.rank.asc()
+
+    relevance = match(
+        *[getattr(Client, column) for column in SEARCH_COLUMNS],
+        against=" ".join(f'+"{term}"' for term in terms)
+    ).in_boolean_mode()
+    condition = relevance > 0
+    return query.filter(condition if mac_condition is None else or_(condition, mac_condition)), relevance.desc()
@@ -3,30 +3,42 @@ TV Panel SQL Server
 FastAPI server with MySQL/SQLAlchemy backend and comprehensive CRUD operations.
 """
 
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query, UploadFile, File, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi.responses import FileResponse, StreamingResponse, ORJSONResponse
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, delete, func, and_, or_, true, literal, literal_column, String
 from pydantic import BaseModel, Field
 import os
-import io
-import csv
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any
-import bcrypt
 import jwt
 from jwt import PyJWTError
 import logging
 import json
-import csv
-import io
+import base64
+import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
 
 # Import database models
 from database import *
+from search import setup_search, apply_search, lookup_filter
+from cache import TTLCache, reference_cache
+from passwords import hash_password_async, verify_password_async, needs_rehash
+from imports import (
+    ImportProgress, client_csv_rows, json_table_rows, insert_batches, upsert_client_batches, parse_match_keys,
+    save_upload, start_import_job, shutdown_parse_pools, IMPORT_MODES, IMPORT_REPORT_MAX_ISSUES,
+    iter_json_items, cancel_running_import_job, resume_import_jobs, IMPORT_BATCH_SIZE, JSON_IMPORT_TABLES,
+    JSON_IMPORT_SCHEMAS
+)
+from import_report import dry_run_client_csv
+from exports import (
+    EXPORT_FORMATS, EXPORT_SNAPSHOT_TTL_SECONDS, export_stream, export_filename, export_media_type, create_snapshot,
+    snapshot_path, snapshot_etag, touch_snapshot, parse_range, file_chunks
+)
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -39,8 +51,16 @@ api_router = APIRouter(prefix="/api")
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "tv-panel-sql-secret-key-2024")
 ALGORITHM = "HS256"
+JWT_EXPIRE_HOURS = int(os.getenv("JWT_EXPIRE_HOURS", "24"))
 security = HTTPBearer()
 
+# Authenticated admins by id; TTL bounds how long a deleted/changed admin's tokens keep working
+admin_cache = TTLCache(ttl=float(os.getenv("ADMIN_CACHE_TTL", "60")))
+# Dashboard / bot client counts; also dropped whenever the clients table version moves
+stats_cache = TTLCache(ttl=float(os.getenv("STATS_CACHE_TTL", "60")), max_entries=8)
+# Rows per INSERT batch for bulk client creation
+CLIENT_BULK_BATCH_SIZE = int(os.getenv("CLIENT_BULK_BATCH_SIZE", "500"))
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -48,10 +68,17 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # ============ PYDANTIC MODELS ============
 
+class AdminPrincipal(BaseModel):
+    """Authenticated admin as cached for request auth"""
+    id: int
+    login: str
+    email: Optional[str] = None
+
 class AdminResponse(BaseModel):
     id: int
     login: str
@@ -149,6 +176,20 @@ class ClientUpdate(BaseModel):
     notes: Optional[str] = None
     status: Optional[str] = None
 
+class ClientFilter(BaseModel):
+    search: Optional[str] = None
+    expiry_filter: Optional[str] = None
+
+class ClientBulkAction(BaseModel):
+    action: str  # "extend", "set_status", "move", "delete"
+    ids: Optional[List[int]] = None
+    filter: Optional[ClientFilter] = None  # same semantics as GET /clients
+    all: bool = False  # every client; a filter must have criteria
+    days: Optional[int] = None
+    status: Optional[str] = None
+    panel_id: Optional[int] = None
+    app_id: Optional[int] = None
+
 class PaymentMethodResponse(BaseModel):
     id: int
     method_id: str
@@ -266,38 +307,53 @@ class AndroidAppCreate(BaseModel):
     minimum_android_version: Optional[str] = None
     file_size: Optional[str] = None
 
-# ============ AUTH FUNCTIONS ============
-
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# Models JSON imports validate their items against
+JSON_IMPORT_SCHEMAS.update({
+    "payment_methods": PaymentMethodCreate,
+    "pricing_config": PricingConfigCreate,
+    "questions": QuestionCreate,
+    "smart_tv_apps": SmartTVAppCreate,
+    "android_apps": AndroidAppCreate,
+})
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+# ============ AUTH FUNCTIONS ============
 
 def create_jwt_token(data: dict):
-    return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+    now = datetime.utcnow()
+    to_encode = {**data, "iat": now, "exp": now + timedelta(hours=JWT_EXPIRE_HOURS)}
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_jwt_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Tokens without an expiry (issued before exp was added) are rejected rather than valid forever
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "iat"]})
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except PyJWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)):
     token = credentials.credentials
     payload = verify_jwt_token(token)
     admin_id = payload.get("admin_id")
     if admin_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     
-    admin = db.query(Admin).filter(Admin.id == admin_id).first()
-    if admin is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin not found")
+    # Signature and expiry are checked statelessly; the admin row only on a cache miss
+    principal = admin_cache.get(admin_id)
+    if principal is None:
+        admin = await db.get(Admin, admin_id)
+        if admin is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin not found")
+        principal = AdminPrincipal(id=admin.id, login=admin.login, email=admin.email)
+        admin_cache.set(admin_id, principal)
     
-    return admin
+    return principal
+
+def invalidate_admin(admin_id: int):
+    """Call whenever an admin is changed or deleted so their tokens are re-checked"""
+    admin_cache.invalidate(admin_id)
 
 # ============ HELPER FUNCTIONS ============
 
@@ -306,62 +362,232 @@ def calculate_days_left(expires_date: date) -> int:
     delta = expires_date - today
     return delta.days
 
-def enrich_client_response(client: Client, db: Session) -> ClientResponse:
-    """Enrich client data with related information"""
+def client_stats_query(today: date):
+    """Client counts for the dashboard and bot stats as one SELECT; each count is a scalar subquery a
+    (covering) index answers, instead of a scan of every row"""
+    week_from_now = today + timedelta(days=7)
+    today_start = datetime.combine(today, datetime.min.time())
+    
+    def count_where(*conditions):
+        return select(func.count()).select_from(Client).where(*conditions).scalar_subquery()
+    
+    return select(
+        count_where().label("total_clients"),
+        count_where(Client.expires_date >= today).label("active_clients"),
+        count_where(Client.expires_date < today).label("expired_clients"),
+        count_where(Client.expires_date.between(today, week_from_now)).label("expiring_soon"),
+        count_where(Client.telegram_id.isnot(None)).label("clients_with_telegram"),
+        count_where(Client.created_at >= today_start, Client.created_at < today_start + timedelta(days=1)).label("clients_added_today"),
+    )
+
+async def client_stats(db: AsyncSession) -> dict:
+    """Client counts for the dashboard and bot stats in one query.
+    Cached per day and clients table version: local writes show up at once, other processes' within
+    REFERENCE_CACHE_CHECK_SECONDS."""
+    today = date.today()
+    key = (today, await reference_cache.version(db, "clients"))
+    stats = stats_cache.get(key)
+    if stats is not None:
+        return stats
+    
+    row = (await db.execute(client_stats_query(today))).one()
+    stats = {name: int(value or 0) for name, value in row._mapping.items()}
+    stats_cache.set(key, stats)
+    return stats
+
+# ?fields= support: response fields computed from other columns
+CLIENT_FIELD_COLUMNS = {
+    "panel_name": ["panel_id"],
+    "app_name": ["app_id"],
+    "contact_type_name": ["contact_type_id"],
+    "days_left": ["expires_date"],
+}
+CLIENT_FIELD_GETTERS = {
+    "panel_name": lambda client, names: names["panel"].get(client.panel_id),
+    "app_name": lambda client, names: names["app"].get(client.app_id),
+    "contact_type_name": lambda client, names: names["contact_type"].get(client.contact_type_id),
+    "days_left": lambda client, names: calculate_days_left(client.expires_date) if client.expires_date else None,
+}
+
+def parse_client_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a comma-separated ?fields= list against ClientResponse (id is always included)"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in ClientResponse.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+def client_select(fields: Optional[List[str]] = None, extra_columns: List[str] = ()):
+    """Client SELECT; with `fields`, only the columns those response fields need are loaded.
+    Related names come from the reference cache, not joins."""
+    query = select(Client)
+    if fields:
+        columns = set(extra_columns)
+        for field in fields:
+            columns.update(CLIENT_FIELD_COLUMNS.get(field, [field]))
+        query = query.options(load_only(*[getattr(Client, column) for column in sorted(columns)]))
+    return query
+
+async def reference_names(db: AsyncSession) -> dict:
+    """Panel, app and contact type names by id (cached, versioned)"""
+    return {
+        "panel": await reference_cache.names(db, Panel),
+        "app": await reference_cache.names(db, App),
+        "contact_type": await reference_cache.names(db, ContactType),
+    }
+
+def enrich_client_response(client: Client, names: dict, fields: Optional[List[str]] = None) -> dict:
+    """Client row as a ClientResponse-shaped dict (names from reference_names), or only `fields` of it.
+    Built directly from the ORM row so list endpoints can serialize it without a model round trip."""
+    if fields:
+        return {
+            field: CLIENT_FIELD_GETTERS[field](client, names) if field in CLIENT_FIELD_GETTERS else getattr(client, field)
+            for field in fields
+        }
     
     # Calculate days left and status
     days_left = None
     if client.expires_date:
         days_left = calculate_days_left(client.expires_date)
     
-    # Get related data
-    panel_name = None
-    if client.panel_id:
-        panel = db.query(Panel).filter(Panel.id == client.panel_id).first()
-        panel_name = panel.name if panel else None
-    
-    app_name = None
-    if client.app_id:
-        app = db.query(App).filter(App.id == client.app_id).first()
-        app_name = app.name if app else None
-    
-    contact_type_name = None
-    if client.contact_type_id:
-        contact_type = db.query(ContactType).filter(ContactType.id == client.contact_type_id).first()
-        contact_type_name = contact_type.name if contact_type else None
-    
-    return ClientResponse(
-        id=client.id,
-        line_id=client.line_id,
-        name=client.name,
-        expires_date=client.expires_date,
-        login=client.login,
-        password=client.password,
-        mac=client.mac,
-        key_value=client.key_value,
-        contact_value=client.contact_value,
-        telegram_id=client.telegram_id,
-        notes=client.notes,
-        status=client.status,
-        created_at=client.created_at,
-        panel_name=panel_name,
-        app_name=app_name,
-        contact_type_name=contact_type_name,
-        days_left=days_left
-    )
+    # Related names come from the reference cache, no per-row queries
+    panel_name = names["panel"].get(client.panel_id)
+    app_name = names["app"].get(client.app_id)
+    contact_type_name = names["contact_type"].get(client.contact_type_id)
+    
+    return {
+        "id": client.id,
+        "line_id": client.line_id,
+        "name": client.name,
+        "expires_date": client.expires_date,
+        "login": client.login,
+        "password": client.password,
+        "mac": client.mac,
+        "key_value": client.key_value,
+        "contact_value": client.contact_value,
+        "telegram_id": client.telegram_id,
+        "notes": client.notes,
+        "status": client.status,
+        "created_at": client.created_at,
+        "panel_name": panel_name,
+        "app_name": app_name,
+        "contact_type_name": contact_type_name,
+        "days_left": days_left
+    }
+
+CLIENT_EXPIRY_FILTERS = ("expired", "expiring_soon", "active")
+
+def filter_clients(query, search: Optional[str] = None, expiry_filter: Optional[str] = None):
+    """Apply the client list filters. Returns (query, search relevance ordering or None)."""
+    # Search filter (full-text index when available)
+    relevance = None
+    if search:
+        query, relevance = apply_search(query, search)
+    
+    # Expiry filter
+    if expiry_filter:
+        today = date.today()
+        if expiry_filter == "expired":
+            query = query.filter(Client.expires_date < today)
+        elif expiry_filter == "expiring_soon":
+            week_from_now = today + timedelta(days=7)
+            query = query.filter(Client.expires_date.between(today, week_from_now))
+        elif expiry_filter == "active":
+            query = query.filter(Client.expires_date >= today)
+    
+    return query, relevance
+
+def add_days(column, days: int, dialect: str):
+    """SQL expression for `column + days` (date arithmetic differs per dialect)"""
+    if dialect == "sqlite":
+        return func.date(column, f"{days:+d} days")
+    return func.date_add(column, literal_column(f"INTERVAL {int(days)} DAY"))
+
+def encode_cursor(sort_by: str, sort_order: str, client: Client) -> str:
+    """Opaque keyset cursor: the last row's sort value plus its id"""
+    value = getattr(client, sort_by)
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = {"s": sort_by, "o": sort_order, "v": value, "id": client.id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str):
+    """Return (sort value, id) from a cursor issued for the same sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if payload["s"] != sort_by or payload["o"] != sort_order:
+            raise ValueError("cursor was issued for a different sort")
+        value = payload["v"]
+        if value is not None:
+            python_type = Client.__table__.columns[sort_by].type.python_type
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            else:
+                value = python_type(value)
+        return value, int(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_change_cursor(seq: int, last_id: int) -> str:
+    """Opaque change feed cursor: the last change's sequence number plus its client id"""
+    return base64.urlsafe_b64encode(json.dumps({"seq": seq, "id": last_id}).encode('utf-8')).decode('ascii')
+
+def decode_change_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return int(payload["seq"]), int(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def allocate_change_seq(db: AsyncSession) -> int:
+    """Change sequence number for a set-based statement (ORM flushes stamp their own)"""
+    return await db.run_sync(next_change_seq)
+
+def keyset_filter(column, value, last_id: int, descending: bool):
+    """Rows strictly after (value, last_id) in the list order; NULLs sort lowest as on SQLite and MySQL"""
+    if descending:
+        if value is None:
+            return and_(column.is_(None), Client.id < last_id)
+        return or_(
+            column < value,
+            and_(column == value, Client.id < last_id),
+            column.is_(None)
+        )
+    if value is None:
+        return or_(and_(column.is_(None), Client.id > last_id), column.isnot(None))
+    return or_(column > value, and_(column == value, Client.id > last_id))
+
+async def reference_list_response(request: Request, db: AsyncSession, model, response_model) -> Response:
+    """Reference table list with an ETag from the table version: 304 when the client's copy is current,
+    otherwise the JSON body serialized once per version by the reference cache"""
+    table_name = model.__tablename__
+    etag = f'W/"{table_name}-{await reference_cache.version(db, table_name)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    body = await reference_cache.json(db, model, list(response_model.model_fields))
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # ============ API ENDPOINTS ============
 
 # Authentication
 @api_router.post("/auth/login")
-async def login(admin_data: dict, db: Session = Depends(get_db)):
-    admin = db.query(Admin).filter(Admin.login == admin_data["username"]).first()
-    if not admin or not verify_password(admin_data["password"], admin.password):
+async def login(admin_data: dict, db: AsyncSession = Depends(get_async_db)):
+    admin = await db.scalar(select(Admin).where(Admin.login == admin_data["username"]))
+    if not admin or not await verify_password_async(admin_data["password"], admin.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
+    # Upgrade the stored hash when BCRYPT_ROUNDS changed
+    if needs_rehash(admin.password):
+        admin.password = await hash_password_async(admin_data["password"])
+    
     # Update last login
     admin.last_login = datetime.utcnow()
-    db.commit()
+    await db.commit()
+    invalidate_admin(admin.id)
     
     token_data = {"admin_id": admin.id, "username": admin.login}
     token = create_jwt_token(token_data)
@@ -373,21 +599,21 @@ async def login(admin_data: dict, db: Session = Depends(get_db)):
     }
 
 @api_router.post("/auth/register")
-async def register(admin_data: dict, db: Session = Depends(get_db)):
+async def register(admin_data: dict, db: AsyncSession = Depends(get_async_db)):
     # Check if admin already exists
-    existing_admin = db.query(Admin).filter(Admin.login == admin_data["username"]).first()
+    existing_admin = await db.scalar(select(Admin).where(Admin.login == admin_data["username"]))
     if existing_admin:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Admin already exists")
     
     # Create new admin
     admin = Admin(
         login=admin_data["username"],
-        password=hash_password(admin_data["password"]),
+        password=await hash_password_async(admin_data["password"]),
         email=admin_data.get("email")
     )
     
     db.add(admin)
-    db.commit()
+    await db.commit()
     return {"message": "Admin created successfully"}
 
 # Clients
@@ -399,49 +625,77 @@ async def get_clients(
     limit: int = 50,
     sort_by: str = "created_at",
     sort_order: str = "desc",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Client)
-    
-    # Search filter
-    if search:
-        query = query.filter(
-            (Client.name.contains(search)) |
-            (Client.login.contains(search)) |
-            (Client.mac.contains(search)) |
-            (Client.line_id.contains(search)) |
-            (Client.contact_value.contains(search))
-        )
-    
-    # Expiry filter
-    if expiry_filter:
-        today = date.today()
-        if expiry_filter == "expired":
-            query = query.filter(Client.expires_date < today)
-        elif expiry_filter == "expiring_soon":
-            week_from_now = today + timedelta(days=7)
-            query = query.filter(Client.expires_date.between(today, week_from_now))
-        elif expiry_filter == "active":
-            query = query.filter(Client.expires_date >= today)
-    
-    # Sorting
-    if sort_order == "desc":
-        query = query.order_by(getattr(Client, sort_by).desc())
+    """List clients. Pass `cursor` (empty for the first page) for keyset pagination;
+    the next page's cursor is returned in the X-Next-Cursor header.
+    `fields` (comma-separated ClientResponse fields) narrows both the SELECT and the payload."""
+    if sort_by != "relevance" and sort_by not in Client.__table__.columns:
+        raise HTTPException(status_code=400, detail="Invalid sort_by")
+    if sort_by == "relevance" and cursor is not None:
+        raise HTTPException(status_code=400, detail="Cursor pagination is not available for relevance sort")
+    
+    selected_fields = parse_client_fields(fields)
+    query = client_select(selected_fields, extra_columns=[sort_by] if cursor is not None else [])
+    query, relevance = filter_clients(query, search, expiry_filter)
+    
+    # Sorting (id breaks ties so the order is stable and usable as a keyset)
+    descending = sort_order == "desc"
+    if sort_by == "relevance":
+        # Best match first; newest first when the LIKE fallback answered the search
+        query = query.order_by(relevance if relevance is not None else Client.created_at.desc(), Client.id.desc())
     else:
-        query = query.order_by(getattr(Client, sort_by))
+        sort_column = getattr(Client, sort_by)
+        if descending:
+            query = query.order_by(sort_column.desc(), Client.id.desc())
+        else:
+            query = query.order_by(sort_column, Client.id)
     
     # Pagination
-    offset = (page - 1) * limit
-    clients = query.offset(offset).limit(limit).all()
+    headers = {}
+    if cursor is not None:
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort_by, sort_order)
+            if isinstance(value, datetime) and db.bind.dialect.name == "sqlite":
+                # SQLite keeps CURRENT_TIMESTAMP values as text without microseconds
+                value = literal(str(value), String)
+            query = query.filter(keyset_filter(sort_column, value, last_id, descending))
+        clients = (await db.execute(query.limit(limit))).scalars().all()
+        if len(clients) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(sort_by, sort_order, clients[-1])
+    else:
+        offset = (page - 1) * limit
+        clients = (await db.execute(query.offset(offset).limit(limit))).scalars().all()
     
-    # Enrich client data
-    enriched_clients = [enrich_client_response(client, db) for client in clients]
+    # Enrich client data; rows are already ClientResponse-shaped, so serialize them directly
+    names = await reference_names(db)
+    enriched_clients = [enrich_client_response(client, names, selected_fields) for client in clients]
     
-    return enriched_clients
+    return ORJSONResponse(enriched_clients, headers=headers)
+
+@api_router.get("/clients/lookup", response_model=List[ClientResponse])
+async def lookup_clients(
+    mac: Optional[str] = None,
+    login: Optional[str] = None,
+    exact: bool = False,
+    limit: int = 20,
+    current_admin = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Find clients by MAC (any format) and/or login using the normalized key indexes"""
+    condition = lookup_filter(mac=mac, login=login, exact=exact)
+    if condition is None:
+        raise HTTPException(status_code=400, detail="Provide mac or login")
+    
+    clients = (await db.execute(client_select().where(condition).order_by(Client.id).limit(limit))).scalars().all()
+    names = await reference_names(db)
+    return ORJSONResponse([enrich_client_response(client, names) for client in clients])
 
 @api_router.post("/clients", response_model=ClientResponse)
-async def create_client(client_data: ClientCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_client(client_data: ClientCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     # Calculate expiry date
     expires_date = date.today() + timedelta(days=client_data.subscription_period)
     
@@ -463,22 +717,150 @@ async def create_client(client_data: ClientCreate, current_admin = Depends(get_c
     )
     
     db.add(client)
-    db.commit()
-    db.refresh(client)
+    await db.commit()
+    await db.refresh(client)
+    
+    return enrich_client_response(client, await reference_names(db))
+
+@api_router.get("/clients/changes")
+async def get_client_changes(
+    cursor: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    fields: Optional[str] = None,
+    current_admin = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Client change feed for keeping a local mirror in sync.
+    Returns upserts (current client rows) and deletes in change order after `cursor`; without a cursor
+    it starts at `updated_since`, or at the beginning for a full sync. Poll again with `next_cursor`."""
+    if cursor:
+        seq, last_id = decode_change_cursor(cursor)
+    elif updated_since:
+        # First change at or after the timestamp (updated_at / deleted_at are indexed)
+        firsts = [
+            (await db.execute(select(func.min(Client.change_seq)).where(Client.updated_at >= updated_since))).scalar(),
+            (await db.execute(select(func.min(ClientTombstone.change_seq)).where(ClientTombstone.deleted_at >= updated_since))).scalar(),
+        ]
+        firsts = [first for first in firsts if first is not None]
+        if firsts:
+            seq, last_id = min(firsts), -1
+        else:
+            head = (await db.execute(select(TableVersion.version).where(TableVersion.table_name == "clients"))).scalar()
+            seq, last_id = head or 0, 2 ** 31
+    else:
+        seq, last_id = -1, 0
+    
+    def after(seq_column, id_column):
+        return or_(seq_column > seq, and_(seq_column == seq, id_column > last_id))
+    
+    selected_fields = parse_client_fields(fields)
+    upserts = (await db.execute(
+        client_select(selected_fields, extra_columns=["change_seq"])
+        .where(after(Client.change_seq, Client.id))
+        .order_by(Client.change_seq, Client.id)
+        .limit(limit + 1)
+    )).scalars().all()
+    deletes = (await db.execute(
+        select(ClientTombstone)
+        .where(after(ClientTombstone.change_seq, ClientTombstone.client_id))
+        .order_by(ClientTombstone.change_seq, ClientTombstone.client_id)
+        .limit(limit + 1)
+    )).scalars().all()
+    
+    merged = sorted(
+        [(client.change_seq, client.id, client) for client in upserts] +
+        [(tombstone.change_seq, tombstone.client_id, None) for tombstone in deletes],
+        key=lambda change: change[:2]
+    )
+    page = merged[:limit]
+    
+    names = await reference_names(db)
+    changes = [
+        {"op": "upsert", "seq": change_seq, "client": enrich_client_response(client, names, selected_fields)}
+        if client is not None else
+        {"op": "delete", "seq": change_seq, "id": client_id}
+        for change_seq, client_id, client in page
+    ]
+    if page:
+        seq, last_id = page[-1][:2]
+    
+    return ORJSONResponse({
+        "changes": changes,
+        "next_cursor": encode_change_cursor(seq, last_id),
+        "has_more": len(merged) > limit
+    })
+
+@api_router.post("/clients/bulk-create")
+async def bulk_create_clients(
+    clients_data: List[ClientCreate],
+    batch_size: int = Query(CLIENT_BULK_BATCH_SIZE, ge=1, le=5000),
+    current_admin = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many clients in one transaction. Every row is validated before anything is inserted;
+    rows go in with one multi-row INSERT ... RETURNING per batch, so no per-row refresh is needed."""
+    names = await reference_names(db)
+    errors = []
+    for index, client_data in enumerate(clients_data):
+        if client_data.subscription_period < 0:
+            errors.append({"index": index, "error": "subscription_period must not be negative"})
+        for field, kind in (("panel_id", "panel"), ("app_id", "app"), ("contact_type_id", "contact_type")):
+            value = getattr(client_data, field)
+            if value is not None and value not in names[kind]:
+                errors.append({"index": index, "error": f"Unknown {field} {value}"})
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": "No clients were created", "errors": errors})
     
-    return enrich_client_response(client, db)
+    today = date.today()
+    seq = await allocate_change_seq(db)
+    rows = []
+    for client_data in clients_data:
+        row = client_data.dict(exclude={"subscription_period"})
+        row.update(
+            expires_date=today + timedelta(days=client_data.subscription_period),
+            mac_key=normalize_mac(client_data.mac),
+            login_key=normalize_login(client_data.login),
+            created_by=current_admin.id,
+            change_seq=seq
+        )
+        rows.append(row)
+    
+    created = []
+    if db.bind.dialect.insert_executemany_returning:
+        # Core insert keeps every batch a single multi-row INSERT; ids are assigned in VALUES order,
+        # so sorting RETURNING rows by id lines them up with the request rows
+        statement = insert(Client.__table__).returning(*Client.__table__.c)
+        for start in range(0, len(rows), batch_size):
+            result = await db.execute(statement, rows[start:start + batch_size])
+            created.extend(sorted(result.all(), key=lambda row: row.id))
+    else:
+        # No multi-row RETURNING (MySQL): let the unit of work insert each batch, then load the
+        # server-generated columns for the whole batch with one SELECT
+        for start in range(0, len(rows), batch_size):
+            batch = [Client(**row) for row in rows[start:start + batch_size]]
+            db.add_all(batch)
+            await db.flush()
+            await db.execute(select(Client).where(Client.id.in_([client.id for client in batch])))
+            created.extend(batch)
+    await db.commit()
+    
+    return ORJSONResponse([
+        {"index": index, **enrich_client_response(client, names)} for index, client in enumerate(created)
+    ])
 
 @api_router.get("/clients/{client_id}", response_model=ClientResponse)
-async def get_client(client_id: int, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    client = db.query(Client).filter(Client.id == client_id).first()
+async def get_client(client_id: int, fields: Optional[str] = None, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    selected_fields = parse_client_fields(fields)
+    client = (await db.execute(client_select(selected_fields).where(Client.id == client_id))).scalar_one_or_none()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    return enrich_client_response(client, db)
+    return ORJSONResponse(enrich_client_response(client, await reference_names(db), selected_fields))
 
 @api_router.put("/clients/{client_id}", response_model=ClientResponse)
-async def update_client(client_id: int, client_data: ClientUpdate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    client = db.query(Client).filter(Client.id == client_id).first()
+async def update_client(client_id: int, client_data: ClientUpdate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    client = await db.get(Client, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -488,39 +870,97 @@ async def update_client(client_id: int, client_data: ClientUpdate, current_admin
         setattr(client, key, value)
     
     client.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(client)
-    
-    return enrich_client_response(client, db)
+    await db.commit()
+    
+    # Nothing is server-generated on update and commits don't expire, so no reload is needed
+    return enrich_client_response(client, await reference_names(db))
+
+@api_router.post("/clients/bulk")
+async def bulk_client_action(bulk: ClientBulkAction, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    """Extend, set status, move or delete many clients with one set-based statement.
+    Targets either `ids` or every client matching `filter` (as in GET /clients)."""
+    if [bulk.ids is not None, bulk.filter is not None, bulk.all].count(True) != 1:
+        raise HTTPException(status_code=400, detail="Exactly one of ids, filter or all is required")
+    if bulk.ids is not None:
+        target = Client.id.in_(bulk.ids)
+    elif bulk.filter is not None:
+        if not bulk.filter.search and not bulk.filter.expiry_filter:
+            raise HTTPException(status_code=400, detail="filter has no criteria; pass all: true to target every client")
+        if bulk.filter.expiry_filter and bulk.filter.expiry_filter not in CLIENT_EXPIRY_FILTERS:
+            raise HTTPException(status_code=400, detail="Invalid expiry_filter")
+        # Search may join the full-text index, so select matching ids and update by id
+        matching, _ = filter_clients(select(Client.id), bulk.filter.search, bulk.filter.expiry_filter)
+        matching = matching.subquery()
+        target = Client.id.in_(select(matching.c.id))
+    else:
+        target = true()
+    
+    if bulk.action not in ("extend", "set_status", "move", "delete"):
+        raise HTTPException(status_code=400, detail="Invalid action")
+    
+    if bulk.action == "delete":
+        seq = await allocate_change_seq(db)
+        target_ids = select(Client.id).where(target)
+        # Tombstones for the change feed (replacing any left by an earlier client with the same id)
+        await db.execute(delete(ClientTombstone).where(ClientTombstone.client_id.in_(target_ids)))
+        await db.execute(insert(ClientTombstone).from_select(
+            ["client_id", "change_seq", "deleted_at"],
+            select(Client.id, literal(seq), func.current_timestamp()).where(target)
+        ))
+        # client_links rows go with their client, as the ORM cascade does for single deletes
+        await db.execute(delete(ClientLink).where(ClientLink.client_id.in_(target_ids)))
+        statement = delete(Client).where(target)
+    else:
+        if bulk.action == "extend":
+            if not bulk.days or bulk.days < 1:
+                raise HTTPException(status_code=400, detail="days must be a positive number")
+            # Extend from the current expiry, or from today for clients without one
+            base = func.coalesce(Client.expires_date, date.today())
+            values = {"expires_date": add_days(base, bulk.days, db.bind.dialect.name)}
+        elif bulk.action == "set_status":
+            if bulk.status not in Client.status.type.enums:
+                raise HTTPException(status_code=400, detail="Invalid status")
+            values = {"status": bulk.status}
+        elif bulk.action == "move":
+            values = {key: value for key, value in (("panel_id", bulk.panel_id), ("app_id", bulk.app_id)) if value is not None}
+            if not values:
+                raise HTTPException(status_code=400, detail="panel_id or app_id is required")
+        values["updated_at"] = datetime.utcnow()
+        values["change_seq"] = await allocate_change_seq(db)
+        statement = update(Client).where(target).values(**values)
+    
+    result = await db.execute(statement.execution_options(synchronize_session=False))
+    await db.commit()
+    
+    return {"action": bulk.action, "affected": result.rowcount}
 
 @api_router.delete("/clients/{client_id}")
-async def delete_client(client_id: int, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    client = db.query(Client).filter(Client.id == client_id).first()
+async def delete_client(client_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    client = await db.get(Client, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    db.delete(client)
-    db.commit()
+    await db.delete(client)
+    await db.commit()
     
     return {"message": "Client deleted successfully"}
 
 # Panels
 @api_router.get("/panels", response_model=List[PanelResponse])
-async def get_panels(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    panels = db.query(Panel).all()
-    return panels
+async def get_panels(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, Panel, PanelResponse)
 
 @api_router.post("/panels", response_model=PanelResponse)
-async def create_panel(panel_data: PanelCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_panel(panel_data: PanelCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     panel = Panel(**panel_data.dict(), created_by=current_admin.id)
     db.add(panel)
-    db.commit()
-    db.refresh(panel)
+    await db.commit()
+    await db.refresh(panel)
     return panel
 
 @api_router.put("/panels/{panel_id}", response_model=PanelResponse)
-async def update_panel(panel_id: int, panel_data: PanelCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    panel = db.query(Panel).filter(Panel.id == panel_id).first()
+async def update_panel(panel_id: int, panel_data: PanelCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    panel = await db.get(Panel, panel_id)
     if not panel:
         raise HTTPException(status_code=404, detail="Panel not found")
     
@@ -528,37 +968,36 @@ async def update_panel(panel_id: int, panel_data: PanelCreate, current_admin = D
         setattr(panel, key, value)
     
     panel.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(panel)
+    await db.commit()
+    await db.refresh(panel)
     return panel
 
 @api_router.delete("/panels/{panel_id}")
-async def delete_panel(panel_id: int, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    panel = db.query(Panel).filter(Panel.id == panel_id).first()
+async def delete_panel(panel_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    panel = await db.get(Panel, panel_id)
     if not panel:
         raise HTTPException(status_code=404, detail="Panel not found")
     
-    db.delete(panel)
-    db.commit()
+    await db.delete(panel)
+    await db.commit()
     return {"message": "Panel deleted successfully"}
 
 # Apps
 @api_router.get("/apps", response_model=List[AppResponse])
-async def get_apps(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    apps = db.query(App).all()
-    return apps
+async def get_apps(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, App, AppResponse)
 
 @api_router.post("/apps", response_model=AppResponse)
-async def create_app(app_data: AppCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_app(app_data: AppCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     app = App(**app_data.dict(), created_by=current_admin.id)
     db.add(app)
-    db.commit()
-    db.refresh(app)
+    await db.commit()
+    await db.refresh(app)
     return app
 
 @api_router.put("/apps/{app_id}", response_model=AppResponse)
-async def update_app(app_id: int, app_data: AppCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    app = db.query(App).filter(App.id == app_id).first()
+async def update_app(app_id: int, app_data: AppCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    app = await db.get(App, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     
@@ -566,37 +1005,36 @@ async def update_app(app_id: int, app_data: AppCreate, current_admin = Depends(g
         setattr(app, key, value)
     
     app.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(app)
+    await db.commit()
+    await db.refresh(app)
     return app
 
 @api_router.delete("/apps/{app_id}")
-async def delete_app(app_id: int, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    app = db.query(App).filter(App.id == app_id).first()
+async def delete_app(app_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    app = await db.get(App, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     
-    db.delete(app)
-    db.commit()
+    await db.delete(app)
+    await db.commit()
     return {"message": "App deleted successfully"}
 
 # Contact Types
 @api_router.get("/contact-types", response_model=List[ContactTypeResponse])
-async def get_contact_types(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    contact_types = db.query(ContactType).all()
-    return contact_types
+async def get_contact_types(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, ContactType, ContactTypeResponse)
 
 @api_router.post("/contact-types", response_model=ContactTypeResponse)
-async def create_contact_type(contact_type_data: ContactTypeCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_contact_type(contact_type_data: ContactTypeCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     contact_type = ContactType(**contact_type_data.dict(), created_by=current_admin.id)
     db.add(contact_type)
-    db.commit()
-    db.refresh(contact_type)
+    await db.commit()
+    await db.refresh(contact_type)
     return contact_type
 
 @api_router.put("/contact-types/{contact_type_id}", response_model=ContactTypeResponse)
-async def update_contact_type(contact_type_id: int, contact_type_data: ContactTypeCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    contact_type = db.query(ContactType).filter(ContactType.id == contact_type_id).first()
+async def update_contact_type(contact_type_id: int, contact_type_data: ContactTypeCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    contact_type = await db.get(ContactType, contact_type_id)
     if not contact_type:
         raise HTTPException(status_code=404, detail="Contact type not found")
     
@@ -604,37 +1042,36 @@ async def update_contact_type(contact_type_id: int, contact_type_data: ContactTy
         setattr(contact_type, key, value)
     
     contact_type.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(contact_type)
+    await db.commit()
+    await db.refresh(contact_type)
     return contact_type
 
 @api_router.delete("/contact-types/{contact_type_id}")
-async def delete_contact_type(contact_type_id: int, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    contact_type = db.query(ContactType).filter(ContactType.id == contact_type_id).first()
+async def delete_contact_type(contact_type_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    contact_type = await db.get(ContactType, contact_type_id)
     if not contact_type:
         raise HTTPException(status_code=404, detail="Contact type not found")
     
-    db.delete(contact_type)
-    db.commit()
+    await db.delete(contact_type)
+    await db.commit()
     return {"message": "Contact type deleted successfully"}
 
 # Payment Methods
 @api_router.get("/payment-methods", response_model=List[PaymentMethodResponse])
-async def get_payment_methods(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    payment_methods = db.query(PaymentMethod).all()
-    return payment_methods
+async def get_payment_methods(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, PaymentMethod, PaymentMethodResponse)
 
 @api_router.post("/payment-methods", response_model=PaymentMethodResponse)
-async def create_payment_method(payment_method_data: PaymentMethodCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_payment_method(payment_method_data: PaymentMethodCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     payment_method = PaymentMethod(**payment_method_data.dict())
     db.add(payment_method)
-    db.commit()
-    db.refresh(payment_method)
+    await db.commit()
+    await db.refresh(payment_method)
     return payment_method
 
 @api_router.put("/payment-methods/{method_id}")
-async def update_payment_method(method_id: int, payment_method_data: PaymentMethodCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    payment_method = db.query(PaymentMethod).filter(PaymentMethod.id == method_id).first()
+async def update_payment_method(method_id: int, payment_method_data: PaymentMethodCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    payment_method = await db.get(PaymentMethod, method_id)
     if not payment_method:
         raise HTTPException(status_code=404, detail="Payment method not found")
     
@@ -642,37 +1079,36 @@ async def update_payment_method(method_id: int, payment_method_data: PaymentMeth
         setattr(payment_method, key, value)
     
     payment_method.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(payment_method)
+    await db.commit()
+    await db.refresh(payment_method)
     return payment_method
 
 @api_router.delete("/payment-methods/{method_id}")
-async def delete_payment_method(method_id: int, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    payment_method = db.query(PaymentMethod).filter(PaymentMethod.id == method_id).first()
+async def delete_payment_method(method_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    payment_method = await db.get(PaymentMethod, method_id)
     if not payment_method:
         raise HTTPException(status_code=404, detail="Payment method not found")
     
-    db.delete(payment_method)
-    db.commit()
+    await db.delete(payment_method)
+    await db.commit()
     return {"message": "Payment method deleted successfully"}
 
 # Pricing Config
 @api_router.get("/pricing-config", response_model=List[PricingConfigResponse])
-async def get_pricing_config(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    pricing_config = db.query(PricingConfig).all()
-    return pricing_config
+async def get_pricing_config(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, PricingConfig, PricingConfigResponse)
 
 @api_router.post("/pricing-config", response_model=PricingConfigResponse)
-async def create_pricing_config(pricing_data: PricingConfigCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_pricing_config(pricing_data: PricingConfigCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     pricing = PricingConfig(**pricing_data.dict())
     db.add(pricing)
-    db.commit()
-    db.refresh(pricing)
+    await db.commit()
+    await db.refresh(pricing)
     return pricing
 
 @api_router.put("/pricing-config/{pricing_id}")
-async def update_pricing_config(pricing_id: int, pricing_data: PricingConfigCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    pricing = db.query(PricingConfig).filter(PricingConfig.id == pricing_id).first()
+async def update_pricing_config(pricing_id: int, pricing_data: PricingConfigCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    pricing = await db.get(PricingConfig, pricing_id)
     if not pricing:
         raise HTTPException(status_code=404, detail="Pricing config not found")
     
@@ -680,27 +1116,26 @@ async def update_pricing_config(pricing_id: int, pricing_data: PricingConfigCrea
         setattr(pricing, key, value)
     
     pricing.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(pricing)
+    await db.commit()
+    await db.refresh(pricing)
     return pricing
 
 # Questions/FAQ
 @api_router.get("/questions", response_model=List[QuestionResponse])
-async def get_questions(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    questions = db.query(Question).all()
-    return questions
+async def get_questions(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, Question, QuestionResponse)
 
 @api_router.post("/questions", response_model=QuestionResponse)
-async def create_question(question_data: QuestionCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_question(question_data: QuestionCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     question = Question(**question_data.dict())
     db.add(question)
-    db.commit()
-    db.refresh(question)
+    await db.commit()
+    await db.refresh(question)
     return question
 
 @api_router.put("/questions/{question_id}")
-async def update_question(question_id: int, question_data: QuestionCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    question = db.query(Question).filter(Question.id == question_id).first()
+async def update_question(question_id: int, question_data: QuestionCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    question = await db.get(Question, question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
@@ -708,27 +1143,26 @@ async def update_question(question_id: int, question_data: QuestionCreate, curre
         setattr(question, key, value)
     
     question.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(question)
+    await db.commit()
+    await db.refresh(question)
     return question
 
 # Smart TV Activations
 @api_router.get("/smart-tv-activations", response_model=List[SmartTVActivationResponse])
-async def get_smart_tv_activations(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    activations = db.query(SmartTVActivation).all()
-    return activations
+async def get_smart_tv_activations(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, SmartTVActivation, SmartTVActivationResponse)
 
 @api_router.post("/smart-tv-activations", response_model=SmartTVActivationResponse)
-async def create_smart_tv_activation(activation_data: SmartTVActivationCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_smart_tv_activation(activation_data: SmartTVActivationCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     activation = SmartTVActivation(**activation_data.dict())
     db.add(activation)
-    db.commit()
-    db.refresh(activation)
+    await db.commit()
+    await db.refresh(activation)
     return activation
 
 @api_router.put("/smart-tv-activations/{activation_id}")
-async def update_smart_tv_activation(activation_id: int, activation_data: SmartTVActivationCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    activation = db.query(SmartTVActivation).filter(SmartTVActivation.id == activation_id).first()
+async def update_smart_tv_activation(activation_id: int, activation_data: SmartTVActivationCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    activation = await db.get(SmartTVActivation, activation_id)
     if not activation:
         raise HTTPException(status_code=404, detail="Smart TV activation not found")
     
@@ -736,37 +1170,36 @@ async def update_smart_tv_activation(activation_id: int, activation_data: SmartT
         setattr(activation, key, value)
     
     activation.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(activation)
+    await db.commit()
+    await db.refresh(activation)
     return activation
 
 @api_router.delete("/smart-tv-activations/{activation_id}")
-async def delete_smart_tv_activation(activation_id: int, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    activation = db.query(SmartTVActivation).filter(SmartTVActivation.id == activation_id).first()
+async def delete_smart_tv_activation(activation_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    activation = await db.get(SmartTVActivation, activation_id)
     if not activation:
         raise HTTPException(status_code=404, detail="Smart TV activation not found")
     
-    db.delete(activation)
-    db.commit()
+    await db.delete(activation)
+    await db.commit()
     return {"message": "Smart TV activation deleted successfully"}
 
 # Smart TV Apps
 @api_router.get("/smart-tv-apps", response_model=List[SmartTVAppResponse])
-async def get_smart_tv_apps(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    apps = db.query(SmartTVApp).all()
-    return apps
+async def get_smart_tv_apps(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, SmartTVApp, SmartTVAppResponse)
 
 @api_router.post("/smart-tv-apps", response_model=SmartTVAppResponse)
-async def create_smart_tv_app(app_data: SmartTVAppCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_smart_tv_app(app_data: SmartTVAppCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     app = SmartTVApp(**app_data.dict())
     db.add(app)
-    db.commit()
-    db.refresh(app)
+    await db.commit()
+    await db.refresh(app)
     return app
 
 @api_router.put("/smart-tv-apps/{app_id}")
-async def update_smart_tv_app(app_id: int, app_data: SmartTVAppCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    app = db.query(SmartTVApp).filter(SmartTVApp.id == app_id).first()
+async def update_smart_tv_app(app_id: int, app_data: SmartTVAppCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    app = await db.get(SmartTVApp, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Smart TV app not found")
     
@@ -774,27 +1207,26 @@ async def update_smart_tv_app(app_id: int, app_data: SmartTVAppCreate, current_a
         setattr(app, key, value)
     
     app.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(app)
+    await db.commit()
+    await db.refresh(app)
     return app
 
 # Android Apps
 @api_router.get("/android-apps", response_model=List[AndroidAppResponse])
-async def get_android_apps(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    apps = db.query(AndroidApp).all()
-    return apps
+async def get_android_apps(request: Request, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    return await reference_list_response(request, db, AndroidApp, AndroidAppResponse)
 
 @api_router.post("/android-apps", response_model=AndroidAppResponse)
-async def create_android_app(app_data: AndroidAppCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def create_android_app(app_data: AndroidAppCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     app = AndroidApp(**app_data.dict())
     db.add(app)
-    db.commit()
-    db.refresh(app)
+    await db.commit()
+    await db.refresh(app)
     return app
 
 @api_router.put("/android-apps/{app_id}")
-async def update_android_app(app_id: int, app_data: AndroidAppCreate, current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    app = db.query(AndroidApp).filter(AndroidApp.id == app_id).first()
+async def update_android_app(app_id: int, app_data: AndroidAppCreate, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    app = await db.get(AndroidApp, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Android app not found")
     
@@ -802,40 +1234,28 @@ async def update_android_app(app_id: int, app_data: AndroidAppCreate, current_ad
         setattr(app, key, value)
     
     app.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(app)
+    await db.commit()
+    await db.refresh(app)
     return app
 
 # Dashboard Stats
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
-    today = date.today()
-    
-    total_clients = db.query(Client).count()
-    active_clients = db.query(Client).filter(Client.expires_date >= today).count()
-    expired_clients = db.query(Client).filter(Client.expires_date < today).count()
-    
-    week_from_now = today + timedelta(days=7)
-    expiring_soon = db.query(Client).filter(
-        Client.expires_date.between(today, week_from_now)
-    ).count()
+async def get_dashboard_stats(current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    stats = await client_stats(db)
     
     return {
-        "total_clients": total_clients,
-        "active_clients": active_clients,
-        "expired_clients": expired_clients,
-        "expiring_soon": expiring_soon,
+        "total_clients": stats["total_clients"],
+        "active_clients": stats["active_clients"],
+        "expired_clients": stats["expired_clients"],
+        "expiring_soon": stats["expiring_soon"],
     }
 
 # Bot Stats
 @api_router.get("/bot/stats")
-async def get_bot_stats(current_admin = Depends(get_current_admin), db: Session = Depends(get_db)):
+async def get_bot_stats(current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
     """Get real bot statistics from database"""
-    today = date.today()
-    
     # Real data from database
-    total_clients = db.query(Client).count()
-    clients_with_telegram = db.query(Client).filter(Client.telegram_id.isnot(None)).count()
+    stats = await client_stats(db)
     
     # Bot status based on environment variables
     telegram_token = os.getenv('TELEGRAM_BOT_TOKEN', '')
@@ -845,16 +1265,8 @@ async def get_bot_stats(current_admin = Depends(get_current_admin), db: Session
     
     bot_configured = bool(telegram_token and admin_id)
     
-    # Recent activity (clients added today)
-    clients_added_today = db.query(Client).filter(
-        func.date(Client.created_at) == today
-    ).count()
-    
     # Expiring clients (potential notifications)
-    week_from_now = today + timedelta(days=7)
-    expiring_clients = db.query(Client).filter(
-        Client.expires_date.between(today, week_from_now)
-    ).count()
+    expiring_clients = stats["expiring_soon"]
     
     return {
         "bot_configured": bot_configured,
@@ -863,126 +1275,98 @@ async def get_bot_stats(current_admin = Depends(get_current_admin), db: Session
         "reminder_token_present": bool(reminder_token),
         "admin_id": admin_id,
         "whatsapp_admin": whatsapp_number,
-        "total_clients": total_clients,
-        "clients_with_telegram": clients_with_telegram,
-        "clients_added_today": clients_added_today,
+        "total_clients": stats["total_clients"],
+        "clients_with_telegram": stats["clients_with_telegram"],
+        "clients_added_today": stats["clients_added_today"],
         "expiring_clients": expiring_clients,
         "last_activity": datetime.now().strftime("%H:%M"),
         "notifications_today": expiring_clients  # Approximate
     }
 
 # CSV Import
+async def create_import_job(db: AsyncSession, table_name: str, file_format: str, file: UploadFile, batch_size: int,
+                            admin_id: int, import_mode: str = "insert", match_on: str = None) -> dict:
+    """Save the upload and queue it as a background import job"""
+    job = ImportJob(
+        table_name=table_name,
+        file_format=file_format,
+        file_path=await save_upload(file),
+        original_filename=file.filename,
+        batch_size=batch_size,
+        import_mode=import_mode,
+        match_on=match_on,
+        created_by=admin_id
+    )
+    db.add(job)
+    await db.commit()
+    start_import_job(job.id)
+    return {"job_id": job.id, "status": "pending", "message": "Import został dodany do kolejki"}
+
 @api_router.post("/import-csv/clients")
 async def import_clients_csv(
     file: UploadFile = File(...),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000),
+    background: bool = False,
+    mode: str = "insert",
+    match_on: str = "login,mac,line_id",
+    dry_run: bool = False,
     current_admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Import clients from CSV file"""
+    """Import clients from CSV file. With `background`, returns a job id at once (see /import-jobs).
+    mode=upsert updates clients of the panel matching a row on one of `match_on` (login, mac, line_id;
+    first match wins) instead of creating duplicates. `dry_run` only validates the file and returns
+    a per-row report (invalid dates / statuses / MACs, duplicates in the file and in the database)."""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Plik musi być w formacie CSV")
+    if mode not in IMPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(IMPORT_MODES)}")
+    try:
+        match_keys = parse_match_keys(match_on)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if dry_run:
+        try:
+            return await dry_run_client_csv(db, file, match_keys, upsert=mode == "upsert")
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=f"Błąd odczytu CSV: {str(e)}")
+        finally:
+            await file.close()
     
     try:
-        # Read CSV content
-        content = await file.read()
-        csv_content = content.decode('utf-8')
+        if background:
+            return await create_import_job(db, "clients", "csv", file, batch_size, current_admin.id, mode, ",".join(match_keys))
         
-        # Parse CSV
-        csv_reader = csv.DictReader(io.StringIO(csv_content))
-        
-        imported_count = 0
-        errors = []
-        
-        # Get or create default panel and contact types
-        default_panel = db.query(Panel).first()
-        if not default_panel:
-            default_panel = Panel(name="Import Panel", description="Auto-created during CSV import")
-            db.add(default_panel)
-            db.commit()
-            db.refresh(default_panel)
-        
-        # Create contact type mapping
-        contact_type_mapping = {}
-        for contact_type in ['WhatsApp', 'Telegram', 'Messanger']:
-            ct = db.query(ContactType).filter(ContactType.name == contact_type).first()
-            if not ct:
-                ct = ContactType(name=contact_type, description=f"Auto-created for {contact_type}")
-                db.add(ct)
-                db.commit()
-                db.refresh(ct)
-            contact_type_mapping[contact_type] = ct.id
-        
-        for row_num, row in enumerate(csv_reader, start=2):
-            try:
-                # Parse telegram ID from contact data if it's a telegram username
-                telegram_id = None
-                contact_value = row.get('Dane Kontaktowe', '').strip()
-                contact_type = row.get('Typ Kontaktu', '').strip()
-                
-                # Extract telegram ID from username (if it starts with @)
-                if contact_type == 'Telegram' and contact_value.startswith('@'):
-                    # For now, we'll store the username in contact_value
-                    # In a real implementation, you'd need to resolve @username to telegram_id
-                    pass
-                
-                # Parse expiration date
-                expires_date = None
-                date_str = row.get('Data wygaśnięcia', '').strip()
-                if date_str:
-                    try:
-                        expires_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    except ValueError:
-                        pass
-                
-                # Get contact type ID
-                contact_type_id = contact_type_mapping.get(contact_type) if contact_type else None
-                
-                # Create client
-                client = Client(
-                    name=row.get('Nazwa', '').strip(),
-                    login=row.get('Login', '').strip(),
-                    password=row.get('Hasło', '').strip(),
-                    expires_date=expires_date,
-                    panel_id=default_panel.id,
-                    mac=row.get('MAC', '').strip(),
-                    key_value=row.get('Klucz', '').strip(),
-                    contact_type_id=contact_type_id,
-                    contact_value=contact_value,
-                    telegram_id=telegram_id,
-                    line_id=row.get('Line ID', '').strip(),
-                    status=row.get('Status', 'active').strip(),
-                    notes=f"Imported from CSV. Original ID: {row.get('ID', '')}"
-                )
-                
-                db.add(client)
-                imported_count += 1
-                
-                # Commit every 100 records to avoid memory issues
-                if imported_count % 100 == 0:
-                    db.commit()
-                    
-            except Exception as e:
-                errors.append(f"Wiersz {row_num}: {str(e)}")
-                continue
-        
-        # Final commit
-        db.commit()
+        # Batched INSERTs, one savepoint per batch: a bad row costs only that row
+        progress = ImportProgress()
+        rows = client_csv_rows(db, file, progress)
+        if mode == "upsert":
+            imported_count = await upsert_client_batches(db, rows, match_keys, batch_size, progress)
+        else:
+            imported_count = await insert_batches(db, Client.__table__, rows, batch_size, progress)
+        await db.commit()
+        errors = progress.errors
         
         result = {
             "imported_count": imported_count,
-            "total_processed": row_num - 1,
-            "errors": errors[:10]  # Limit to first 10 errors
+            "updated_count": progress.updated,
+            "total_processed": progress.parsed,
+            "error_count": progress.failed,
+            "errors": errors[:IMPORT_REPORT_MAX_ISSUES]  # dry_run=true reports every row before importing
         }
         
-        if errors:
-            result["message"] = f"Zaimportowano {imported_count} klientów z {len(errors)} błędami"
+        if progress.failed:
+            result["message"] = f"Zaimportowano {imported_count} klientów z {progress.failed} błędami"
         else:
             result["message"] = f"Pomyślnie zaimportowano {imported_count} klientów"
+        if progress.updated:
+            result["message"] += f", zaktualizowano {progress.updated}"
             
         return result
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Błąd importu CSV: {str(e)}")
     finally:
         await file.close()
@@ -992,100 +1376,218 @@ async def import_clients_csv(
 async def import_json_data(
     table_name: str,
     file: UploadFile = File(...),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000),
+    background: bool = False,
     current_admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Import JSON data into specified table"""
+    """Import a JSON array or NDJSON (one object per line) into specified table, parsed while it is read
+    and validated against the table's *Create model. With `background`, returns a job id at once (see /import-jobs)."""
+    model = JSON_IMPORT_TABLES.get(table_name)
+    if model is None:
+        raise HTTPException(status_code=400, detail="Unsupported table name")
     
     try:
-        content = await file.read()
-        json_data = json.loads(content)
-        
-        # Import based on table name
-        imported_count = 0
-        
-        if table_name == "payment_methods":
-            for item in json_data:
-                payment_method = PaymentMethod(**item)
-                db.add(payment_method)
-                imported_count += 1
+        if background:
+            return await create_import_job(db, table_name, "json", file, batch_size, current_admin.id)
         
-        elif table_name == "pricing_config":
-            for item in json_data:
-                pricing = PricingConfig(**item)
-                db.add(pricing)
-                imported_count += 1
+        progress = ImportProgress()
+        rows = json_table_rows(model, iter_json_items(file), progress)
+        imported_count = await insert_batches(db, model.__table__, rows, batch_size, progress)
+        await db.commit()
         
-        elif table_name == "questions":
-            for item in json_data:
-                question = Question(**item)
-                db.add(question)
-                imported_count += 1
-        
-        elif table_name == "smart_tv_apps":
-            for item in json_data:
-                app = SmartTVApp(**item)
-                db.add(app)
-                imported_count += 1
-        
-        elif table_name == "android_apps":
-            for item in json_data:
-                app = AndroidApp(**item)
-                db.add(app)
-                imported_count += 1
-        
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported table name")
-        
-        db.commit()
-        
-        return {"message": f"Successfully imported {imported_count} records into {table_name}"}
+        result = {"message": f"Successfully imported {imported_count} records into {table_name}"}
+        if progress.errors:
+            result["errors"] = progress.errors[:10]
+        return result
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
 
+# Import Jobs
+def import_job_response(job: ImportJob) -> dict:
+    return {
+        "id": job.id,
+        "table_name": job.table_name,
+        "file_format": job.file_format,
+        "original_filename": job.original_filename,
+        "status": job.status,
+        "rows_parsed": job.rows_parsed or 0,
+        "import_mode": job.import_mode or "insert",
+        "rows_inserted": job.rows_inserted or 0,
+        "rows_updated": job.rows_updated or 0,
+        "rows_failed": job.rows_failed or 0,
+        "errors": json.loads(job.errors or "[]")[:10],
+        "message": job.message,
+        "cancel_requested": bool(job.cancel_requested),
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+    }
+
+@api_router.get("/import-jobs")
+async def get_import_jobs(limit: int = Query(20, ge=1, le=100), current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    jobs = (await db.execute(select(ImportJob).order_by(ImportJob.id.desc()).limit(limit))).scalars().all()
+    return [import_job_response(job) for job in jobs]
+
+@api_router.get("/import-jobs/{job_id}")
+async def get_import_job(job_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return import_job_response(job)
+
+@api_router.post("/import-jobs/{job_id}/cancel")
+async def cancel_import_job(job_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    """Stop a job; a running job stops before committing its next batch"""
+    job = await db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.status not in ("pending", "running", "failed"):
+        raise HTTPException(status_code=400, detail=f"Import job is already {job.status}")
+    if job.status == "running" and cancel_running_import_job(job.id):
+        return {**import_job_response(job), "cancel_requested": True}
+    
+    job.cancel_requested = True
+    if job.status in ("pending", "failed"):
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+    await db.commit()
+    if job.status == "cancelled" and os.path.exists(job.file_path):
+        os.remove(job.file_path)
+    return import_job_response(job)
+
+@api_router.post("/import-jobs/{job_id}/resume")
+async def resume_import_job(job_id: int, current_admin = Depends(get_current_admin), db: AsyncSession = Depends(get_async_db)):
+    """Restart a failed job after its last committed batch"""
+    job = await db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.status != "failed":
+        raise HTTPException(status_code=400, detail="Only failed import jobs can be resumed")
+    
+    job.status = "pending"
+    job.message = None
+    job.finished_at = None
+    await db.commit()
+    start_import_job(job.id)
+    return import_job_response(job)
+
+# Tables available for export
+EXPORT_TABLES = {
+    "clients": Client,
+    "panels": Panel,
+    "apps": App,
+    "contact_types": ContactType,
+    "payment_methods": PaymentMethod,
+    "pricing_config": PricingConfig,
+    "questions": Question,
+    "smart_tv_apps": SmartTVApp,
+    "android_apps": AndroidApp,
+}
+# Derived lookup / change-feed bookkeeping columns, not client data
+CLIENT_EXPORT_EXCLUDED = {"mac_key", "login_key", "change_seq"}
+
+def export_query(table_name: str):
+    """Core SELECT for a table export; clients carry their panel / app / contact type names"""
+    model = EXPORT_TABLES.get(table_name)
+    if model is None:
+        raise HTTPException(status_code=400, detail="Unsupported table name")
+    if model is Client:
+        columns = [column for column in Client.__table__.columns if column.name not in CLIENT_EXPORT_EXCLUDED]
+        return (
+            select(
+                *columns,
+                Panel.name.label("panel_name"),
+                App.name.label("app_name"),
+                ContactType.name.label("contact_type_name")
+            )
+            .outerjoin(Panel, Client.panel_id == Panel.id)
+            .outerjoin(App, Client.app_id == App.id)
+            .outerjoin(ContactType, Client.contact_type_id == ContactType.id)
+        )
+    return select(*model.__table__.columns)
+
+def export_source_tables(table_name: str) -> list:
+    """Tables whose versions identify an export's content"""
+    return ["clients", "panels", "apps", "contact_types"] if table_name == "clients" else [table_name]
+
+def validate_export_format(export_format: str):
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
 @api_router.get("/export-csv/{table_name}")
 async def export_csv_data(
     table_name: str,
+    export_format: str = Query("csv", alias="format"),
+    gzip: bool = False,
+    current_admin = Depends(get_current_admin)
+):
+    """Export table data as CSV or NDJSON (`format`), gzip-compressed with `gzip`, streamed as it is read.
+    For a download that can be resumed, create a snapshot (POST /export-snapshots/{table_name})."""
+    validate_export_format(export_format)
+    query = export_query(table_name)
+    
+    return StreamingResponse(
+        export_stream(query, export_format, gzip),
+        media_type=export_media_type(export_format, gzip),
+        headers={"Content-Disposition": f"attachment; filename={export_filename(table_name, export_format, gzip)}"}
+    )
+
+@api_router.post("/export-snapshots/{table_name}")
+async def create_export_snapshot(
+    table_name: str,
+    export_format: str = Query("csv", alias="format"),
+    gzip: bool = False,
     current_admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Export table data to CSV"""
-    
-    try:
-        # Query data based on table name
-        if table_name == "clients":
-            data = db.query(Client).all()
-        elif table_name == "panels":
-            data = db.query(Panel).all()
-        elif table_name == "apps":
-            data = db.query(App).all()
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported table name")
-        
-        # Create CSV
-        output = io.StringIO()
-        if data:
-            # Get column names from first record
-            columns = [column.name for column in data[0].__table__.columns]
-            writer = csv.DictWriter(output, fieldnames=columns)
-            writer.writeheader()
-            
-            for row in data:
-                row_dict = {column: getattr(row, column, '') for column in columns}
-                writer.writerow(row_dict)
-        
-        output.seek(0)
-        
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={table_name}_export.csv"}
-        )
-    
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Export failed: {str(e)}")
+    """Write an export to a snapshot file (reused while the table is unchanged) and return its
+    download URL; downloads of a snapshot can be resumed with Range requests"""
+    validate_export_format(export_format)
+    query = export_query(table_name)
+    name = await create_snapshot(db, query, table_name, export_source_tables(table_name), export_format, gzip)
+    path = snapshot_path(name)
+    return {
+        "name": name,
+        "url": f"/api/export-snapshots/{name}",
+        "size": os.path.getsize(path),
+        "etag": snapshot_etag(path),
+        "expires_in": EXPORT_SNAPSHOT_TTL_SECONDS,
+    }
+
+@api_router.get("/export-snapshots/{name}")
+async def download_export_snapshot(name: str, request: Request, current_admin = Depends(get_current_admin)):
+    """Download a snapshot; supports single-range Range requests and If-Range"""
+    path = snapshot_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found or expired")
+    size = os.path.getsize(path)
+    etag = snapshot_etag(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f"attachment; filename={name}",
+    }
+    media_type = export_media_type(name.split(".")[1], name.endswith(".gz"))
+    
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    touch_snapshot(path)
+    
+    if byte_range is None:
+        first, last, status_code = 0, size - 1, 200
+    else:
+        (first, last), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    headers["Content-Length"] = str(last - first + 1)
+    return StreamingResponse(file_chunks(path, first, last), status_code=status_code, media_type=media_type, headers=headers)
 
 # Password Generator
 @api_router.get("/generate-password")
@@ -1111,8 +1613,16 @@ async def startup_event():
     try:
         init_database()
         print("✅ Database initialized successfully")
+        print(f"✅ Client search backend: {setup_search(engine) or 'LIKE fallback'}")
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
+    # Pending imports and imports interrupted by a restart continue in the background
+    app.state.import_jobs = asyncio.create_task(resume_import_jobs())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.import_jobs.cancel()
+    shutdown_parse_pools()
 
 # Configure logging
 logging.basicConfig(
@@ -0,0 +1,30 @@
+"""
+Shared fixtures: the SQL API (backend/sql_server.py) on a throwaway SQLite database, logged in as the default admin.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The database is chosen when `database` is imported, so this has to run before any test module imports it
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+TEST_DB_DIR = tempfile.mkdtemp(prefix="tv_panel_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'tv_panel.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+sys.path.insert(0, BACKEND_DIR)
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import sql_server
+
+    with TestClient(sql_server.app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/api/auth/login", json={"username": "admin", "password": "admin123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
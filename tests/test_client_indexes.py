@@ -0,0 +1,35 @@
+"""
+The dashboard and client list queries are answered from the ix_clients_* indexes, not by scanning the table.
+"""
+
+from datetime import date
+
+import pytest
+
+from database import Client, explain
+
+def assert_uses_client_indexes(statement):
+    plan = explain(statement)
+    table_steps = [step[-1] for step in plan if str(step[-1]).startswith(("SCAN clients", "SEARCH clients"))]
+    assert table_steps, plan
+    for step in table_steps:
+        assert "INDEX ix_clients_" in step, plan
+
+def test_dashboard_stats_use_indexes(client):
+    from sql_server import client_stats_query
+
+    assert_uses_client_indexes(client_stats_query(date.today()))
+
+@pytest.mark.parametrize("sort_by", ["created_at", "expires_date", "updated_at"])
+def test_client_list_order_uses_indexes(client, sort_by):
+    from sql_server import client_select
+
+    column = getattr(Client, sort_by)
+    assert_uses_client_indexes(client_select().order_by(column.desc(), Client.id.desc()).limit(50))
+
+@pytest.mark.parametrize("expiry_filter", ["expired", "expiring_soon", "active"])
+def test_client_list_expiry_filters_use_indexes(client, expiry_filter):
+    from sql_server import client_select, filter_clients
+
+    query, _ = filter_clients(client_select(), expiry_filter=expiry_filter)
+    assert_uses_client_indexes(query.order_by(Client.created_at.desc(), Client.id.desc()).limit(50))
@@ -0,0 +1,53 @@
+"""
+A synchronous import that fails partway through leaves nothing behind: batches written before the failure
+are rolled back with it, and no row keeps the placeholder change sequence number.
+"""
+
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+import imports
+from database import AsyncSessionLocal, Client, Question
+
+@pytest.fixture
+def small_reads(monkeypatch):
+    # The failing row is read (and earlier batches written) only after several reads
+    monkeypatch.setattr(imports, "IMPORT_READ_CHUNK_BYTES", 64)
+
+def table_state(client, model):
+    async def query():
+        async with AsyncSessionLocal() as db:
+            count = await db.scalar(select(func.count()).select_from(model))
+            pending = await db.scalar(select(func.count()).select_from(Client).where(Client.change_seq < 0))
+            return count, pending
+    return client.portal.call(query)
+
+def test_failed_csv_import_leaves_no_rows(client, auth_headers, small_reads):
+    clients_before, _ = table_state(client, Client)
+    rows = [f"Failing {index},failing{index},2027-01-01".encode() for index in range(25)]
+    rows[22] = b"Failing 22,\xff\xfe,2027-01-01"  # not UTF-8
+    body = "Nazwa,Login,Data wygaśnięcia\n".encode() + b"\n".join(rows)
+
+    response = client.post(
+        "/api/import-csv/clients", params={"batch_size": 10},
+        files={"file": ("clients.csv", body, "text/csv")}, headers=auth_headers
+    )
+
+    assert response.status_code == 500
+    assert table_state(client, Client) == (clients_before, 0)
+
+def test_failed_json_import_leaves_no_rows(client, auth_headers, small_reads):
+    questions_before, _ = table_state(client, Question)
+    lines = [json.dumps({"question": f"Failing {index}", "answer": "a"}).encode() for index in range(25)]
+    lines[22] = b'{"question": "\xff\xfe", "answer": "a"}'  # not UTF-8
+    body = b"\n".join(lines)
+
+    response = client.post(
+        "/api/import-json/questions", params={"batch_size": 10},
+        files={"file": ("questions.ndjson", body, "application/x-ndjson")}, headers=auth_headers
+    )
+
+    assert response.status_code == 400
+    assert table_state(client, Question) == (questions_before, 0)
@@ -0,0 +1,59 @@
+"""
+The clients endpoints run a fixed number of queries however many clients there are: panel, app and contact
+type names come from the cached reference names (reference_names) and are attached in Python, never loaded
+per row.
+"""
+
+import pytest
+
+from database import count_queries
+
+def client_payload(index: int, references: dict) -> dict:
+    return {
+        "name": f"Client {index}",
+        "login": f"login{index}",
+        "mac": f"00:11:22:33:{index // 256:02X}:{index % 256:02X}",
+        "subscription_period": 30,
+        **references,
+    }
+
+@pytest.fixture(scope="module")
+def references(client, auth_headers):
+    ids = {}
+    for path, field in (("panels", "panel_id"), ("apps", "app_id"), ("contact-types", "contact_type_id")):
+        response = client.post(f"/api/{path}", json={"name": f"Query count {path}"}, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        ids[field] = response.json()["id"]
+    return ids
+
+def query_counts(client, auth_headers, references, client_id: int) -> dict:
+    """Statements run by each endpoint; every request is made once first so the counts skip cold caches"""
+    requests = {
+        "list": lambda: client.get("/api/clients", params={"limit": 100}, headers=auth_headers),
+        "detail": lambda: client.get(f"/api/clients/{client_id}", headers=auth_headers),
+        "create": lambda: client.post("/api/clients", json=client_payload(0, references), headers=auth_headers),
+        "update": lambda: client.put(f"/api/clients/{client_id}", json={"notes": "updated"}, headers=auth_headers),
+    }
+    counts = {}
+    for name, request in requests.items():
+        assert request().status_code == 200
+        with count_queries() as queries:
+            response = request()
+        assert response.status_code == 200, response.text
+        counts[name] = len(queries)
+    return counts
+
+def test_client_endpoints_query_count_does_not_grow_with_rows(client, auth_headers, references):
+    response = client.post("/api/clients/bulk-create", json=[client_payload(1, references)], headers=auth_headers)
+    assert response.status_code == 200, response.text
+    client_id = response.json()[0]["id"]
+    one_row = query_counts(client, auth_headers, references, client_id)
+
+    response = client.post(
+        "/api/clients/bulk-create", json=[client_payload(index, references) for index in range(2, 51)], headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert len(client.get("/api/clients", params={"limit": 100}, headers=auth_headers).json()) >= 50
+    fifty_rows = query_counts(client, auth_headers, references, client_id)
+
+    assert fifty_rows == one_row